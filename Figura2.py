@@ -2,12 +2,13 @@
 
 
 import numpy as np
-import matplotlib.pyplot as plt
+import pandas as pd
+from irf import get_irf
+from rendering import render_figures
 
 
-# Definisci la funzione
-def IRF(t):
-    return 21.73 + 22.4 * np.exp(-t / 394.4) + 28.24 * np.exp(-t / 36.54) + 27.63 * np.exp(-t / 4.304)
+# Definisci la funzione (vedi irf.py)
+IRF = get_irf('joos2013')
 
 # Genera un intervallo di valori di tempo
 t = np.linspace(0, 1000, 500)
@@ -18,20 +19,12 @@ y = IRF(t)
 # Normalizza i valori di y nell'intervallo [0, 1]
 y_normalized = y / 100
 
-# Creazione del grafico
-plt.figure(figsize=(10, 6))
-plt.plot(t, y_normalized, label='IRF', color='blue')
-plt.xlabel('Tempo trascorso dall\'emissione (anni)')
-plt.ylabel('Frazione che persiste nell\'atmosfera')
-plt.xlim(0, 1000)
-plt.ylim(0, 1.1)
-plt.legend()
-plt.title('IRF')
-plt.grid(True)
-
-# Salva il grafico nella directory specificata
+# Creazione del grafico (vedi rendering.py), salvato nella directory specificata
 directory_path = r'C:\thesis\python'
-file_path = directory_path + r'\fig2.pdf'
-plt.savefig(file_path, bbox_inches='tight')
-# Mostra il grafico
-plt.show()
\ No newline at end of file
+FIGURE = {'name': 'fig2', 'format': 'pdf', 'data': 'irf', 'kind': 'line', 'x': 't', 'y': 'IRF', 'label': 'IRF',
+          'style': {'color': 'blue'}, 'figsize': (10, 6), 'title': 'IRF',
+          'xlabel': 'Tempo trascorso dall\'emissione (anni)', 'ylabel': 'Frazione che persiste nell\'atmosfera',
+          'xlim': (0, 1000), 'ylim': (0, 1.1), 'savefig': {'bbox_inches': 'tight'}}
+
+if __name__ == '__main__':
+    render_figures([FIGURE], {'irf': pd.DataFrame({'t': t, 'IRF': y_normalized})}, directory_path, 1)
@@ -0,0 +1,100 @@
+"""
+This module finds where an equivalence ratio falls inside a target band (e.g. 99 to 101) without sweeping the
+whole dense grid. The (time horizon or discount rate, delay) plane is covered by a coarse grid of cells; the
+ratio is evaluated at the cell corners, and only the cells whose corner values straddle or touch the band are
+split into four, level by level, until the cells are as small as the requested tolerances. All new corners of
+a level are evaluated in one vectorized call of the cell functions of sweeps.py, and every point is evaluated
+once.
+
+The corner values bound the ratio over a cell because the ratios are monotone in the time horizon, the delay
+and the discount rate; cells where the time horizon is shorter than the delay (NaN at every corner) are
+dropped. The points lie on the lattice start + i * tolerance, so the result is the subset of the uniform
+grid with that spacing that lies near the band; when the tolerance does not divide the range, the last point
+of the lattice is the upper bound.
+"""
+
+# Import packages
+import math
+import numpy as np
+import pandas as pd
+from sweeps import moura_costa_cells, lashof_cells, new_approach_cells
+
+# Ratio function and grid column names of every method
+RATIOS = {
+    'moura_costa': (lambda irf, x, y, **kwargs: moura_costa_cells(irf, x, y, **kwargs)[2],
+                    ['Time Horizon (years)', 'Delay (years)', 'Equivalence Ratio']),
+    'lashof': (lambda irf, x, y: lashof_cells(irf, x, y)[2],
+               ['Time Horizon (years)', 'Delay (years)', 'Equivalence Ratio']),
+    'new_approach': (lambda irf, x, y: new_approach_cells(irf, x, y)[3],
+                     ['Discount Rate', 'Delay', 'Equivalence ratio'])
+}
+
+
+def lattice_size(bounds, tolerance):
+    """Number of lattice steps of size tolerance needed to reach the upper bound from the lower one."""
+    # The slack keeps ranges that are a multiple of the tolerance up to rounding (e.g. 0.03 / 0.0005) exact
+    return max(1, math.ceil((bounds[1] - bounds[0]) / tolerance - 1e-9))
+
+
+def lattice_points(bounds, tolerance, index):
+    """Points bounds[0] + index * tolerance of the lattice, the last one clipped to the upper bound."""
+    return np.minimum(bounds[0] + index * tolerance, bounds[1])
+
+
+def refine_cells(ratio, x_bounds, y_bounds, band, x_tolerance, y_tolerance, initial_cells=(8, 8)):
+    """
+    Quadtree refinement of the cells of [x_bounds] x [y_bounds] whose ratio range meets band = (low, high).
+    ratio(x, y) is evaluated on arrays of points. Returns the arrays x, y and ratio of all evaluated points.
+    """
+    nx, ny = lattice_size(x_bounds, x_tolerance), lattice_size(y_bounds, y_tolerance)
+    x_edges = np.unique(np.linspace(0, nx, min(initial_cells[0], nx) + 1).round().astype(int))
+    y_edges = np.unique(np.linspace(0, ny, min(initial_cells[1], ny) + 1).round().astype(int))
+    # Cells as lattice index ranges [i0, i1] x [j0, j1]
+    i0, j0 = (a.ravel() for a in np.meshgrid(x_edges[:-1], y_edges[:-1], indexing='ij'))
+    i1, j1 = (a.ravel() for a in np.meshgrid(x_edges[1:], y_edges[1:], indexing='ij'))
+    values = {}
+
+    def evaluate(i, j):
+        # Point codes of the lattice, evaluated only where not known yet
+        codes = i * (ny + 1) + j
+        new = np.setdiff1d(np.unique(codes), np.fromiter(values, dtype=int, count=len(values)))
+        if len(new):
+            x = lattice_points(x_bounds, x_tolerance, new // (ny + 1))
+            y = lattice_points(y_bounds, y_tolerance, new % (ny + 1))
+            values.update(zip(new.tolist(), np.asarray(ratio(x, y), dtype=float).tolist()))
+        return np.array([values[code] for code in codes.tolist()])
+
+    while len(i0):
+        corners = np.stack([evaluate(i0, j0), evaluate(i0, j1), evaluate(i1, j0), evaluate(i1, j1)])
+        with np.errstate(invalid='ignore'):
+            low = np.min(np.where(np.isnan(corners), np.inf, corners), axis=0)
+            high = np.max(np.where(np.isnan(corners), -np.inf, corners), axis=0)
+        splittable = (i1 - i0 > 1) | (j1 - j0 > 1)
+        refine = (low <= band[1]) & (high >= band[0]) & splittable
+        i0, i1, j0, j1 = i0[refine], i1[refine], j0[refine], j1[refine]
+        # Split every axis that is still wider than one lattice step at its midpoint
+        i_mid = np.where(i1 - i0 > 1, (i0 + i1) // 2, i1)
+        j_mid = np.where(j1 - j0 > 1, (j0 + j1) // 2, j1)
+        children = [(i0, i_mid, j0, j_mid), (i_mid, i1, j0, j_mid), (i0, i_mid, j_mid, j1), (i_mid, i1, j_mid, j1)]
+        # Children of zero width appear where only one axis was split
+        i0, i1, j0, j1 = (np.concatenate(parts) for parts in zip(*children))
+        keep = (i1 > i0) & (j1 > j0)
+        i0, i1, j0, j1 = i0[keep], i1[keep], j0[keep], j1[keep]
+
+    codes = np.array(sorted(values))
+    x = lattice_points(x_bounds, x_tolerance, codes // (ny + 1))
+    y = lattice_points(y_bounds, y_tolerance, codes % (ny + 1))
+    return x, y, np.array([values[code] for code in codes.tolist()])
+
+
+def adaptive_sweep(method, irf, outer_bounds, inner_bounds, band, outer_tolerance, inner_tolerance,
+                   initial_cells=(8, 8), **kwargs):
+    """
+    Ratios of a method (see sweeps.py) on the points of the (outer, inner) plane evaluated by refine_cells
+    around band, as a DataFrame with the grid and ratio columns of the sweep, sorted like a sweep. Extra keyword
+    arguments go to the cell function (e.g. pulse for Moura-Costa).
+    """
+    ratio_function, columns = RATIOS[method]
+    x, y, ratios = refine_cells(lambda x, y: ratio_function(irf, x, y, **kwargs), outer_bounds, inner_bounds,
+                                band, outer_tolerance, inner_tolerance, initial_cells)
+    return pd.DataFrame({columns[0]: x, columns[1]: y, columns[2]: ratios})
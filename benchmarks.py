@@ -0,0 +1,169 @@
+"""
+This script times the building blocks of the analysis: single-cell integrals of the IRFs (quad and closed form),
+the Moura-Costa, Lashof and new approach sweeps at several grid sizes, the matching of new_analysis.py and
+original_analysis_and_plots.py, and the load and merge of the summary script. For every benchmark it
+reports the best and median wall time over a few repeats, the throughput in cells per second and the peak
+memory allocated (tracemalloc), and appends the results to a JSON-lines history file, one line per benchmark
+and run, so scaling curves can be tracked across commits.
+
+Run as: python benchmarks.py [name filter] (e.g. python benchmarks.py lashof)
+"""
+
+# Import packages
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import lru_cache
+import numpy as np
+from scipy.integrate import quad
+from analytic_integration import integrate
+from irf import get_irf
+from matching import best_discount_rates, best_time_horizons
+from merge_to_create_summary_short_results import load_results, merge_results
+from sweeps import moura_costa_grid, lashof_grid, new_approach_grid
+
+# Define the directory path
+directory_path = r'C:\thesis\python'
+history_path = os.path.join(directory_path, 'benchmarks_history.jsonl')
+
+REPEAT = 5
+
+JOOS = get_irf('joos2013')
+DD = JOOS.discounted
+UD = JOOS
+A = get_irf('ipcc1990')
+
+# Grid sizes (time horizons or discount rates x delays) of the sweep benchmarks; the medium one is that of models.py
+GRID_SIZES = {
+    'small': (np.arange(50, 1050, 50), np.arange(10, 210, 10)),
+    'medium': (np.arange(50, 10050, 50), np.arange(10, 210, 10)),
+    'large': (np.arange(1, 10001), np.arange(10, 210, 10))
+}
+RATE_SIZES = {
+    'small': (np.arange(0.001, 0.031, 0.005), np.arange(10, 201, 10)),
+    'medium': (np.arange(0.001, 0.031, 0.0005), np.arange(10, 201, 10)),
+    'large': (np.arange(0.001, 0.031, 0.00001), np.arange(10, 201, 10))
+}
+
+
+def measure(func, repeat=REPEAT):
+    """Best and median wall time of func() over repeat runs, and the peak memory of one extra traced run."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), float(np.median(times)), peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# %% Benchmarks: name -> setup(directory) returning (function to time, number of cells it computes). Only the
+# setups of the selected benchmarks run, so a filtered run does not build the inputs of the others.
+@lru_cache(maxsize=None)
+def matching_inputs():
+    """Lashof and new approach sweeps of new_analysis.py and original_analysis_and_plots.py."""
+    lashof_joos = lashof_grid(UD, *GRID_SIZES['medium']).dropna(subset=['Equivalence Ratio'])
+    return lashof_joos, new_approach_grid(JOOS, *RATE_SIZES['medium'])
+
+
+def best_discount_rates_setup(directory):
+    lashof_joos, _ = matching_inputs()
+    return lambda: best_discount_rates(lashof_joos, JOOS), len(lashof_joos)
+
+
+def best_time_horizons_setup(directory):
+    lashof_joos, new_approach = matching_inputs()
+    return lambda: best_time_horizons(new_approach, lashof_joos), len(new_approach)
+
+
+def load_merge_setup(directory):
+    # merge_to_create_summary_short_results.py reads the sweeps from the sweep cache of the output directory and
+    # merges them into a cube; the first load fills the cache, so the timed runs are cache hits as in the script
+    frames = load_results(directory)
+    return lambda: merge_results(load_results(directory)), sum(len(frame) for frame in frames.values())
+
+
+def cell_setup(func):
+    return lambda directory: (func, 1)
+
+
+def sweep_setup(grid_function, irf, outer, inner):
+    return lambda directory: (lambda: grid_function(irf, outer, inner), len(outer) * len(inner))
+
+
+def build_benchmarks():
+    benchmarks = {}
+
+    # Single cells with quad, as in the original models.py, and in closed form
+    benchmarks['cell/quad/DD'] = cell_setup(lambda: quad(lambda t: DD(t, t + 50, 0.01), 0, np.inf))
+    benchmarks['cell/quad/UD'] = cell_setup(lambda: quad(UD, 0, 1000))
+    benchmarks['cell/quad/A'] = cell_setup(lambda: quad(A, 0, 1000))
+    benchmarks['cell/closed_form/DD'] = cell_setup(lambda: integrate(JOOS, 0, np.inf, 0.01, 50))
+    benchmarks['cell/closed_form/UD'] = cell_setup(lambda: integrate(UD, 0, 1000))
+    benchmarks['cell/closed_form/A'] = cell_setup(lambda: integrate(A, 0, 1000))
+
+    # Full sweeps
+    for size, (time_horizons, delays) in GRID_SIZES.items():
+        benchmarks[f'sweep/moura_costa/{size}'] = sweep_setup(moura_costa_grid, UD, time_horizons, delays)
+        benchmarks[f'sweep/lashof/{size}'] = sweep_setup(lashof_grid, UD, time_horizons, delays)
+    for size, (rates, delays) in RATE_SIZES.items():
+        benchmarks[f'sweep/new_approach/{size}'] = sweep_setup(new_approach_grid, JOOS, rates, delays)
+
+    # Matching of new_analysis.py and original_analysis_and_plots.py, on the grids of those scripts
+    benchmarks['match/best_discount_rates'] = best_discount_rates_setup
+    benchmarks['match/best_time_horizons'] = best_time_horizons_setup
+
+    # Load and merge of merge_to_create_summary_short_results.py
+    benchmarks['summary/load_merge'] = load_merge_setup
+    return benchmarks
+
+
+# %% Run the benchmarks and append them to the history
+def main(name_filter='', history_path=history_path):
+    """Run the benchmarks whose name contains name_filter and append their results to history_path."""
+    run = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count()
+    }
+    results = []
+    # The sweep cache of the summary benchmark is removed when the run ends
+    with tempfile.TemporaryDirectory() as directory:
+        for name, setup in build_benchmarks().items():
+            if name_filter not in name:
+                continue
+            func, cells = setup(directory)
+            best, median, peak = measure(func)
+            results.append({**run, 'benchmark': name, 'cells': cells, 'best_seconds': best,
+                            'median_seconds': median, 'cells_per_second': cells / best, 'peak_bytes': peak})
+            print(f'{name:32} {cells:>9} cells  best {best * 1000:10.3f} ms  median {median * 1000:10.3f} ms  '
+                  f'{cells / best:14.0f} cells/s  peak {peak / 2 ** 20:8.2f} MiB')
+
+    os.makedirs(os.path.dirname(history_path) or '.', exist_ok=True)
+    with open(history_path, 'a') as file:
+        for result in results:
+            file.write(json.dumps(result) + '\n')
+    return results
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else '')
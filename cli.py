@@ -0,0 +1,243 @@
+"""
+Command-line entry point for the batch jobs, for schedulers that start them many times:
+
+    python cli.py --output DIR compute lashof --irf joos2013 --outer 50 10050 50 --inner 10 210 10
+    python cli.py --output DIR compute all
+    python cli.py --output DIR compute all --lashof-1year
+    python cli.py --output DIR compute lashof --inner 10 510 10 --extend
+    python cli.py --output DIR compute new_approach --gradients
+    python cli.py --output DIR uncertainty lashof --amplitude-spread 0.1 --tau-spread 0.2
+    python cli.py --output DIR match discount_rates
+    python cli.py --output DIR merge
+    python cli.py --output DIR plot novel_approach
+    python cli.py --output DIR plot report --workers 4
+    python cli.py --output DIR --profile profile.json compute all
+
+The shared options (--output, --verbose, --profile) go before the subcommand.
+
+Only the standard library is imported at start-up; every subcommand imports the modules it needs when it runs,
+so a compute job never loads matplotlib or seaborn, and closed-form sweeps never load scipy. Nothing is printed
+unless --verbose is given (or --profile, which shows progress on stderr); errors go to stderr with a non-zero
+exit status.
+"""
+
+# Import packages
+import argparse
+import os
+import sys
+import time
+
+# Default output directory of the scripts
+directory_path = r'C:\thesis\python'
+
+# Default grids of models.py, as (start, stop, step)
+DEFAULT_GRIDS = {
+    'moura_costa': ((50, 10000, 50), (10, 210, 10)),
+    'lashof': ((50, 10050, 50), (10, 210, 10)),
+    'new_approach': ((0.001, 0.031, 0.0005), (10, 201, 10))
+}
+
+
+def grid(spec):
+    """Values of a (start, stop, step) grid specification, integer when all three are integers."""
+    import numpy as np
+    start, stop, step = spec
+    if all(float(value).is_integer() for value in spec):
+        return np.arange(int(start), int(stop), int(step))
+    return np.arange(float(start), float(stop), float(step))
+
+
+def report(args, message):
+    if args.verbose:
+        print(message)
+
+
+# %% Subcommands
+def compute(args):
+    if args.method == 'all':
+        from models import Models
+        Models(args.output, diagnostics=args.diagnostics, gradients=args.gradients,
+               lashof_1year=args.lashof_1year).save()
+        report(args, f'Saved all results to {args.output}')
+        return
+    from sweep_cache import METHODS, SweepCache, sweep_identity
+    outer, inner = DEFAULT_GRIDS[args.method]
+    outer = grid(args.outer or outer)
+    inner = grid(args.inner or inner)
+    kwargs = {} if args.pulse is None else {'pulse': args.pulse}
+    name = args.name or f'{args.method}_{args.irf}'
+    sort_by = ['Delay', 'Discount Rate'] if args.method == 'new_approach' else ['Delay (years)',
+                                                                                   'Time Horizon (years)']
+    if args.extend:
+        # Only the cells that the store does not hold yet are computed
+        from incremental import extend_grid
+        path = os.path.join(args.output, name)
+        rows = extend_grid(METHODS[args.method], args.irf, outer, inner, path, sort_by, **kwargs)
+        report(args, f'Added {rows} rows to {path}')
+        return
+    frame = SweepCache(os.path.join(args.output, 'sweep_cache')).sweep(args.method, args.irf, outer, inner, **kwargs)
+    if args.store:
+        from results_store import write_results
+        path = os.path.join(args.output, name)
+        write_results(frame, path, sort_by=sort_by, identity=sweep_identity(METHODS[args.method], args.irf, **kwargs))
+    else:
+        path = os.path.join(args.output, f'{name}.csv')
+        frame.to_csv(path, index=False)
+    report(args, f'Saved {len(frame)} rows to {path}')
+    if args.diagnostics:
+        from diagnostics import save_diagnostics
+        save_diagnostics(args.method, args.irf, outer, inner, args.output, name)
+        report(args, f'Saved the quadrature diagnostics of {name}')
+    if args.gradients:
+        from sensitivities import save_sensitivities
+        save_sensitivities(args.method, args.irf, outer, inner, args.output, name, **kwargs)
+        report(args, f'Saved the derivatives of the equivalence ratios of {name}')
+
+
+def uncertainty(args):
+    from uncertainty import percentile_bands
+    outer, inner = DEFAULT_GRIDS[args.method]
+    frame = percentile_bands(args.method, args.irf, grid(args.outer or outer), grid(args.inner or inner),
+                             args.amplitude_spread, args.tau_spread, n_samples=args.samples, pulse=args.pulse,
+                             seed=args.seed)
+    path = os.path.join(args.output, f'{args.name or f"{args.method}_{args.irf}"}_uncertainty.csv')
+    frame.to_csv(path, index=False)
+    report(args, f'Saved {len(frame)} rows to {path}')
+
+
+def match(args):
+    import numpy as np
+    from matching import best_discount_rates, best_time_horizons
+    from sweep_cache import SweepCache
+    cache = SweepCache(os.path.join(args.output, 'sweep_cache'))
+    lashof_joos = cache.sweep('lashof', args.irf, grid(DEFAULT_GRIDS['lashof'][0]), grid(DEFAULT_GRIDS['lashof'][1]))
+    lashof_joos = lashof_joos.dropna(subset=['Equivalence Ratio'])
+    if args.kind == 'discount_rates':
+        # As in new_analysis.py
+        results_df = best_discount_rates(lashof_joos, args.irf)
+        path = os.path.join(args.output, 'results_analysis2.csv')
+    else:
+        # As in original_analysis_and_plots.py
+        new_approach = cache.sweep('new_approach', args.irf, np.arange(0.001, 0.031, 0.0005), range(10, 201, 10))
+        results_df = best_time_horizons(new_approach, lashof_joos)
+        path = os.path.join(args.output, 'results_analysis.csv')
+    results_df.to_csv(path, index=False)
+    report(args, f'Saved {len(results_df)} rows to {path}')
+
+
+def merge(args):
+    from merge_to_create_summary_short_results import load_results, merge_results, save_results
+    save_results(*merge_results(load_results(args.output)), args.output)
+    report(args, f'Saved the merged results and the short summaries to {args.output}')
+
+
+def plot(args):
+    # The figures are drawn on Agg canvases (see rendering.py): no windows are opened
+    if args.figure == 'novel_approach':
+        from plot_novel_approach import plot as plot_figure
+        paths = plot_figure(args.output)
+    elif args.figure == 'ratio_ranges':
+        from plots_equivalence_ratio_ranges import plot as plot_figure
+        paths = plot_figure(args.output)
+    elif args.figure == 'best_time_horizons':
+        from original_analysis_and_plots import compute_results, plot_results
+        paths = plot_results(compute_results(args.output), args.output, args.workers)
+    elif args.figure == 'best_discount_rates':
+        from new_analysis import compute_results, plot_results
+        paths = plot_results(compute_results(args.output), args.output, args.workers)
+    else:
+        # The figures of both analyses in one parallel rendering run
+        import new_analysis
+        import original_analysis_and_plots
+        from rendering import render_figures
+        best_time_horizons = original_analysis_and_plots.compute_results(args.output)
+        datasets = {
+            'best_discount_rates': new_analysis.compute_results(args.output),
+            'best_time_horizons': best_time_horizons,
+            'total_differences': best_time_horizons.groupby('Discount Rate')['Smallest Difference'].sum().reset_index()
+        }
+        paths = render_figures(new_analysis.FIGURES + original_analysis_and_plots.FIGURES, datasets, args.output,
+                               args.workers)
+    report(args, '\n'.join(f'Saved {path}' for path in paths))
+
+
+# %% Argument parsing
+def grid_argument(parser, name, help):
+    parser.add_argument(name, nargs=3, type=float, metavar=('START', 'STOP', 'STEP'), help=help)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Batch jobs of the equivalence ratio analysis.')
+    parser.add_argument('--output', default=directory_path, help='output directory (default: %(default)s)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='report what was written and the run time')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='show progress and save the stage timings, call counts and peak memory as JSON')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compute_parser = subparsers.add_parser('compute', help='compute a sweep, or all the results of models.py')
+    compute_parser.add_argument('method', choices=['moura_costa', 'lashof', 'new_approach', 'all'])
+    compute_parser.add_argument('--irf', default='joos2013', help='registered IRF name (default: %(default)s)')
+    grid_argument(compute_parser, '--outer', 'time horizons or discount rates (default: the grid of models.py)')
+    grid_argument(compute_parser, '--inner', 'delays (default: the grid of models.py)')
+    compute_parser.add_argument('--pulse', type=float, help='Moura-Costa pulse (default: IRF(0))')
+    compute_parser.add_argument('--name', help='output name (default: METHOD_IRF)')
+    compute_parser.add_argument('--store', action='store_true', help='write a columnar store instead of a CSV')
+    compute_parser.add_argument('--extend', action='store_true',
+                                help='extend the columnar store to the grid, computing only the missing cells')
+    compute_parser.add_argument('--diagnostics', action='store_true',
+                                help='also save the quadrature error estimates, evaluations and timings of every cell')
+    compute_parser.add_argument('--gradients', action='store_true',
+                                help='also save the derivatives of the equivalence ratio in every cell')
+    compute_parser.add_argument('--lashof-1year', action='store_true',
+                                help='with all, also stream the Lashof results at 1-year resolution (about 150 MB)')
+    compute_parser.set_defaults(run=compute)
+
+    uncertainty_parser = subparsers.add_parser('uncertainty',
+                                               help='percentile bands of the ratios over the IRF parameter ranges')
+    uncertainty_parser.add_argument('method', choices=['moura_costa', 'lashof', 'new_approach'])
+    uncertainty_parser.add_argument('--irf', default='joos2013', help='registered IRF name (default: %(default)s)')
+    uncertainty_parser.add_argument('--amplitude-spread', nargs='+', type=float, required=True, metavar='SPREAD',
+                                    help='relative range of the amplitudes, one value or one per term')
+    uncertainty_parser.add_argument('--tau-spread', nargs='+', type=float, required=True, metavar='SPREAD',
+                                    help='relative range of the time constants, one value or one per term')
+    uncertainty_parser.add_argument('--samples', type=int, default=10000,
+                                    help='parameter sets drawn (default: %(default)s)')
+    uncertainty_parser.add_argument('--seed', type=int, help='seed of the random draws')
+    grid_argument(uncertainty_parser, '--outer', 'time horizons or discount rates (default: the grid of models.py)')
+    grid_argument(uncertainty_parser, '--inner', 'delays (default: the grid of models.py)')
+    uncertainty_parser.add_argument('--pulse', type=float, help='Moura-Costa pulse (default: IRF(0))')
+    uncertainty_parser.add_argument('--name', help='output name (default: METHOD_IRF)')
+    uncertainty_parser.set_defaults(run=uncertainty)
+
+    match_parser = subparsers.add_parser('match', help='match the new approach with the Lashof method')
+    match_parser.add_argument('kind', choices=['discount_rates', 'time_horizons'])
+    match_parser.add_argument('--irf', default='joos2013', help='registered IRF name (default: %(default)s)')
+    match_parser.set_defaults(run=match)
+
+    merge_parser = subparsers.add_parser('merge', help='merge the Lashof and Moura-Costa results of both IRFs')
+    merge_parser.set_defaults(run=merge)
+
+    plot_parser = subparsers.add_parser('plot', help='render the figures of a plotting script')
+    plot_parser.add_argument('figure', choices=['novel_approach', 'ratio_ranges', 'best_time_horizons',
+                                                'best_discount_rates', 'report'])
+    plot_parser.add_argument('--workers', type=int, help='rendering processes (default: one per core)')
+    plot_parser.set_defaults(run=plot)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    os.makedirs(args.output, exist_ok=True)
+    if args.profile:
+        from profiling import Profiler
+        with Profiler(' '.join(sys.argv[1:] if argv is None else argv)) as profiler:
+            args.run(args)
+        profiler.dump(args.profile)
+    else:
+        args.run(args)
+    report(args, f'{args.command} took {time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
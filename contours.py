@@ -0,0 +1,61 @@
+"""
+This module answers "which (time horizon, delay) pairs give an equivalence ratio of k?" directly, by solving
+ER(TH, delay) = k for the time horizon at every requested delay. The Moura-Costa and Lashof ratios increase
+monotonically with the time horizon for a fixed delay, so the root is bracketed by [delay, maximum horizon]
+and all delays are solved at once with the vectorized solver of matching.py; the contour TH*(delay) costs a
+few dozen evaluations per delay at any resolution, without a grid. For the new approach the contour is the
+discount rate r*(delay), solved the same way (see matching.solve_discount_rate).
+
+Delays for which the target is not reached within the bracket (e.g. a Moura-Costa target above the ratio of an
+infinite time horizon, or a target below the ratio at TH = delay) are NaN.
+"""
+
+# Import packages
+import numpy as np
+import pandas as pd
+from matching import find_root, solve_discount_rate
+from sensitivities import moura_costa_sensitivities, lashof_sensitivities
+
+# Longest time horizon searched by default (years)
+MAX_TIME_HORIZON = 10 ** 6
+
+# Ratio of the time horizon methods and its derivative dER/dTH as functions of (time horizon, delay)
+RATIOS = {
+    'moura_costa': lambda irf, time_horizon, delay, **kwargs: moura_costa_sensitivities(irf, time_horizon, delay,
+                                                                                        **kwargs)[2:4],
+    'lashof': lambda irf, time_horizon, delay: lashof_sensitivities(irf, time_horizon, delay)[2:4]
+}
+
+
+def solve_time_horizon(method, irf, target_ratio, delay, max_time_horizon=MAX_TIME_HORIZON, **kwargs):
+    """
+    Time horizon at which the ratio of method ('moura_costa' or 'lashof') equals target_ratio, for arrays of
+    target ratios and delays. Returns the time horizons and the residuals of the ratio. Extra keyword arguments
+    go to the cell function (e.g. pulse for Moura-Costa). The solver takes Newton steps with the exact dER/dTH of
+    sensitivities.py.
+    """
+    target_ratio, delay = np.broadcast_arrays(np.asarray(target_ratio, dtype=float), np.asarray(delay, dtype=float))
+    ratio = RATIOS[method]
+
+    def ratio_of(time_horizon):
+        # Benefits that underflow at very long horizons give an infinite ratio, which still brackets the root, and
+        # an undefined derivative there, where the solver does not take Newton steps
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return ratio(irf, time_horizon, delay, **kwargs)
+
+    return find_root(ratio_of, target_ratio, delay, max_time_horizon, derivative=True)
+
+
+def contour(method, irf, target_ratio, delays, max_time_horizon=MAX_TIME_HORIZON, **kwargs):
+    """
+    Contour of the equivalence ratio target_ratio of a method over the delays: TH*(delay) for 'moura_costa'
+    and 'lashof', r*(delay) for 'new_approach'. Returns a DataFrame with the delays, the solved time horizons
+    or discount rates and the absolute residuals of the ratio.
+    """
+    delays = np.asarray(delays, dtype=float)
+    if method == 'new_approach':
+        rates, residuals = solve_discount_rate(irf, target_ratio, delays)
+        return pd.DataFrame({'Delay': delays, 'Discount Rate': rates, 'Residual': np.abs(residuals)})
+    time_horizons, residuals = solve_time_horizon(method, irf, target_ratio, delays, max_time_horizon, **kwargs)
+    return pd.DataFrame({'Delay (years)': delays, 'Time Horizon (years)': time_horizons,
+                         'Residual': np.abs(residuals)})
@@ -0,0 +1,115 @@
+"""
+This module reports how hard the integrals of every grid cell are for adaptive quadrature. The integrals of the
+original models.py (the areas under the IRF up to the time horizon and the delayed time horizon, and the
+discounted areas of the new approach over [0, inf)) are evaluated with scipy's quad and full_output, and for
+every cell the absolute error estimates, the numbers of integrand evaluations, the subdivision warnings and
+the wall time are recorded. For IRFs with a closed form (see analytic_integration.py) the deviation of the quad
+areas from the exact ones is reported as well, which shows where a cheaper integration rule is safe.
+
+Cells share most of their integrals (all delays of a time horizon have the same costs), so every distinct
+integral is evaluated once and its diagnostics are repeated in all the cells that use it; the wall time of a
+cell is the sum of the times of its integrals. The diagnostics are saved as {name}_diagnostics.csv next to the
+results.
+"""
+
+# Import packages
+import os
+import time
+import numpy as np
+import pandas as pd
+from analytic_integration import exp_sum_terms, exp_sum_area
+from irf import get_irf
+from sweeps import TIME_HORIZON_COLUMNS, NEW_APPROACH_COLUMNS, mesh
+
+
+def quad_diagnostics(integrand, start, end, limit=50):
+    """Area, absolute error estimate, integrand evaluations, warning ('' if none) and wall time of quad."""
+    from scipy.integrate import quad
+    begin = time.perf_counter()
+    area, error, info, *message = quad(integrand, start, end, limit=limit, full_output=1)
+    elapsed = time.perf_counter() - begin
+    # Only the first line of a warning, e.g. 'The maximum number of subdivisions (50) has been achieved.'
+    return area, error, info['neval'], message[0].splitlines()[0] if message else '', elapsed
+
+
+# Integrals of every method as (start, end, r, shift) of the area under IRF(t) * exp(-r * (t + shift)), by name
+def _moura_costa_integrals(time_horizon, delay):
+    return {'Costs': (0, time_horizon, 0, 0)}
+
+
+def _lashof_integrals(time_horizon, delay):
+    # As in the original models.py, the delayed area is integrated from 0 and subtracted from the costs
+    return {'Costs': (0, time_horizon, 0, 0), 'Delayed Costs': (0, time_horizon - delay, 0, 0)}
+
+
+def _new_approach_integrals(r, delay):
+    return {'Avoided Emission': (0, np.inf, r, 0), 'Costs of Release': (0, np.inf, r, delay)}
+
+
+INTEGRALS = {
+    'moura_costa': (_moura_costa_integrals, TIME_HORIZON_COLUMNS[:2]),
+    'lashof': (_lashof_integrals, TIME_HORIZON_COLUMNS[:2]),
+    'new_approach': (_new_approach_integrals, NEW_APPROACH_COLUMNS[:2])
+}
+
+
+def diagnose_integrals(irf, start, end, r, shift, limit=50):
+    """quad_diagnostics of the area under irf(t) * exp(-r * (t + shift)) for arrays of bounds and rates."""
+    start, end, r, shift = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (start, end, r, shift)))
+    if start.size == 0:
+        return tuple(np.zeros(start.shape, dtype=dtype) for dtype in (float, float, int, str, float))
+    # Every distinct integral is evaluated once
+    specs, inverse = np.unique(np.stack([start, end, r, shift], axis=-1).reshape(-1, 4), axis=0, return_inverse=True)
+    results = []
+    for lower, upper, rate, offset in specs:
+        if rate == 0 and offset == 0:
+            integrand = irf
+        else:
+            def integrand(t, rate=rate, offset=offset):
+                return irf(t) * np.exp(-rate * (t + offset))
+        results.append(quad_diagnostics(integrand, lower, upper, limit))
+    area, error, evaluations, warning, elapsed = (np.array(values)[inverse.ravel()].reshape(start.shape)
+                                                  for values in zip(*results))
+    return area, error, evaluations, warning, elapsed
+
+
+def diagnose_grid(method, irf, outer, inner, limit=50):
+    """
+    Quadrature diagnostics of every (outer, inner) cell of a sweep of method ('moura_costa', 'lashof' or
+    'new_approach'), in the row order of the grid functions of sweeps.py. Per integral the columns are the
+    absolute error estimate, the integrand evaluations and the warning of quad; per cell the largest relative
+    error estimate, the deviation from the closed form (if the IRF has one) and the wall time. Cells where the
+    time horizon is shorter than the delay are not integrated and left empty.
+    """
+    irf = get_irf(irf)
+    integrals, key_columns = INTEGRALS[method]
+    outer, inner = mesh(outer, inner)
+    valid = np.ones(outer.shape, dtype=bool) if method == 'new_approach' else outer >= inner
+    terms = exp_sum_terms(irf)
+    frame = pd.DataFrame({key_columns[0]: outer, key_columns[1]: inner})
+    relative_error = np.zeros(outer.shape)
+    deviation = np.zeros(outer.shape)
+    wall_time = np.zeros(outer.shape)
+    for name, bounds in integrals(outer[valid], inner[valid]).items():
+        area, error, evaluations, warning, elapsed = diagnose_integrals(irf, *bounds, limit=limit)
+        frame[f'{name} Abs Error'] = pd.Series(error, index=np.flatnonzero(valid))
+        frame[f'{name} Evaluations'] = pd.Series(evaluations, index=np.flatnonzero(valid), dtype='Int64')
+        frame[f'{name} Warning'] = pd.Series(warning, index=np.flatnonzero(valid))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative_error[valid] = np.fmax(relative_error[valid], error / np.abs(area))
+            if terms is not None:
+                exact = exp_sum_area(*terms, *bounds)
+                deviation[valid] = np.fmax(deviation[valid], np.abs(area - exact) / np.abs(exact))
+        wall_time[valid] += elapsed
+    frame['Relative Error'] = np.where(valid, relative_error, np.nan)
+    if terms is not None:
+        frame['Closed Form Deviation'] = np.where(valid, deviation, np.nan)
+    frame['Wall Time (s)'] = np.where(valid, wall_time, np.nan)
+    return frame
+
+
+def save_diagnostics(method, irf, outer, inner, directory, name, limit=50):
+    """Save diagnose_grid as {name}_diagnostics.csv in directory and return the frame."""
+    frame = diagnose_grid(method, irf, outer, inner, limit)
+    frame.to_csv(os.path.join(directory, f'{name}_diagnostics.csv'), index=False)
+    return frame
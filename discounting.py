@@ -0,0 +1,190 @@
+"""
+This module generalizes the constant discount rate of the new approach to time-varying schedules. With a rate
+r(t) the discount factor is D(t) = exp(-integral of r from 0 to t), line 1 (avoided emission) is the area under
+IRF(t) * D(t) and line 2 (costs of release) the area under IRF(t) * D(t + delay), both over [0, inf).
+
+Piecewise-constant schedules (rates[k] from breakpoints[k] to breakpoints[k + 1], the last rate for ever) are
+integrated exactly: on every piece IRF(t) * D(t) is again a sum of exponentials, which is integrated in closed
+form from the start of the piece, so nothing overflows however long the schedule (a callable IRF is integrated
+numerically, piece by piece). Any other discount factor, e.g. the gamma discounting of Weitzman (2001),
+D(t) = (1 + t * sd^2 / mean)^(-mean^2 / sd^2), is integrated with a fixed set of Gauss-Legendre nodes (see
+fixed_nodes): the IRF is evaluated once on the nodes, and the areas of all schedules and delays are weighted sums
+of the discount factors on the nodes.
+
+Schedules run along the leading axes of their parameters (breakpoints and rates carry a trailing axis of
+pieces), delays along the last axis of the results, as with constant rates in sweeps.new_approach_cells.
+"""
+
+# Import packages
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from analytic_integration import exp_sum_terms, exp_sum_area
+from irf import get_irf
+from sweeps import NEW_APPROACH_COLUMNS
+
+# Declining long-term discount rates of the HM Treasury Green Book: 3.5% for years 0-30, then 3%, 2.5%, 2%,
+# 1.5% and 1% from year 301, as (breakpoints, rates)
+GREEN_BOOK = ([0, 31, 76, 126, 201, 301], [0.035, 0.03, 0.025, 0.02, 0.015, 0.01])
+
+
+def _pieces(breakpoints, rates):
+    """Starts, widths, rates and discount factors at the starts of the pieces, broadcast to one shape."""
+    breakpoints, rates = np.broadcast_arrays(np.asarray(breakpoints, dtype=float), np.asarray(rates, dtype=float))
+    widths = np.concatenate([np.diff(breakpoints, axis=-1), np.full(breakpoints.shape[:-1] + (1,), np.inf)], axis=-1)
+    # Discount factor at the start of every piece: the rates accumulated over the previous pieces
+    elapsed = np.concatenate([np.zeros(breakpoints.shape[:-1] + (1,)), np.cumsum(rates * widths, axis=-1)[..., :-1]],
+                             axis=-1)
+    return breakpoints, widths, rates, np.exp(-elapsed)
+
+
+def piecewise_discount_factor(breakpoints, rates):
+    """Discount factor D(t) of piecewise-constant schedules, as a function putting the schedule axes first."""
+    breakpoints, widths, rates, _ = _pieces(breakpoints, rates)
+
+    def discount_factor(t):
+        t = np.asarray(t, dtype=float)
+        # Schedule axes first, then the axes of t, then the pieces
+        axes = tuple(range(breakpoints.ndim - 1, breakpoints.ndim - 1 + t.ndim))
+        starts, lengths, slopes = (np.expand_dims(x, axes) for x in (breakpoints, widths, rates))
+        return np.exp(-np.sum(slopes * np.clip(t[..., np.newaxis] - starts, 0, lengths), axis=-1))
+
+    return discount_factor
+
+
+def gamma_discount_factor(mean_rate, rate_sd):
+    """
+    Discount factor of gamma discounting (Weitzman, 2001) for rates gamma-distributed with mean mean_rate and
+    standard deviation rate_sd; the rate declines from mean_rate towards 0. Schedules run along the axes of the
+    parameters, which are put in front of the axes of t.
+    """
+    mean_rate, rate_sd = np.broadcast_arrays(np.asarray(mean_rate, dtype=float), np.asarray(rate_sd, dtype=float))
+
+    def discount_factor(t):
+        t = np.asarray(t, dtype=float)
+        axes = tuple(range(mean_rate.ndim, mean_rate.ndim + t.ndim))
+        mean, variance = np.expand_dims(mean_rate, axes), np.expand_dims(rate_sd ** 2, axes)
+        return (1 + t * variance / mean) ** (-mean ** 2 / variance)
+
+    return discount_factor
+
+
+# %% Exact areas for piecewise-constant schedules
+def piecewise_cells(irf, breakpoints, rates, delay):
+    """
+    Avoided emission, costs of release, benefits and equivalence ratio of the new approach with piecewise-
+    constant discount rates (the first breakpoint must be 0), for the delays in delay. The outputs have the
+    shape of the schedules plus a trailing axis of delays. A callable IRF is integrated on every piece with the
+    nodes of fixed_nodes, so the kinks of the discount factor at the breakpoints fall between pieces.
+    """
+    irf = get_irf(irf)
+    terms = exp_sum_terms(irf)
+    starts, widths, rates, factors = (x[..., np.newaxis, :] for x in _pieces(breakpoints, rates))
+    delay = np.asarray(delay, dtype=float)[:, np.newaxis]
+
+    def areas(first, width, discount):
+        # Area of every piece from its first time
+        if terms is None:
+            piece_areas = _piece_quadrature(irf, first, width, rates)
+        else:
+            # The IRF terms are rescaled to start at the first time of the piece
+            coefficients, taus = terms
+            scaled = coefficients * np.exp(-first[..., np.newaxis] / taus)
+            piece_areas = exp_sum_area(scaled, taus, 0, width, rates)
+        return (discount * piece_areas).sum(axis=-1)
+
+    avoided_emission = areas(starts, widths, factors)
+    # Line 2 discounts time t at t + delay: the piece from starts[k] covers t from starts[k] - delay
+    first = np.maximum(starts - delay, 0)
+    last = np.maximum(starts + widths - delay, 0)
+    costs_of_release = areas(first, last - first, factors * np.exp(-rates * (first + delay - starts)))
+    avoided_emission = np.broadcast_to(avoided_emission, costs_of_release.shape)
+    benefits = avoided_emission - costs_of_release
+    return avoided_emission, costs_of_release, benefits, avoided_emission / benefits
+
+
+# %% Fixed-node quadrature for any discount factor
+@lru_cache(maxsize=None)
+def fixed_nodes(order=16, split=1.0, t_max=1e12):
+    """
+    Nodes and weights for areas over [0, inf): Gauss-Legendre with order nodes on [0, split] and on every
+    e-fold of [split, t_max] in log t, so decays on any time scale from years to millions of years, and
+    power-law tails like that of gamma discounting, are resolved with a few hundred nodes.
+    """
+    x, w = np.polynomial.legendre.leggauss(order)
+    nodes, weights = [split * (x + 1) / 2], [split * w / 2]
+    edges = np.linspace(np.log(split), np.log(t_max), int(np.ceil(np.log(t_max / split))) + 1)
+    for lower, upper in zip(edges[:-1], edges[1:]):
+        t = np.exp(lower + (upper - lower) * (x + 1) / 2)
+        nodes.append(t)
+        weights.append((upper - lower) / 2 * w * t)
+    return np.concatenate(nodes), np.concatenate(weights)
+
+
+def _piece_quadrature(irf, first, width, rates):
+    """
+    Areas under IRF(first + u) * exp(-rate * u) for u in [0, width], element-wise, with the nodes of fixed_nodes
+    scaled to every piece (an infinite width uses the default nodes). Pieces that repeat are integrated once.
+    """
+    first, width, rates = np.broadcast_arrays(first, width, rates)
+    areas = {}
+    for piece in set(zip(first.ravel().tolist(), width.ravel().tolist(), rates.ravel().tolist())):
+        start, length, rate = piece
+        if length <= 0:
+            areas[piece] = 0.0
+            continue
+        t, weights = fixed_nodes() if np.isinf(length) else fixed_nodes(split=min(1.0, length), t_max=length)
+        areas[piece] = weights @ (irf(start + t) * np.exp(-rate * t))
+    return np.array([areas[piece] for piece in zip(first.ravel().tolist(), width.ravel().tolist(),
+                                                      rates.ravel().tolist())]).reshape(first.shape)
+
+
+def functional_cells(irf, discount_factor, delay, nodes=None):
+    """
+    Avoided emission, costs of release, benefits and equivalence ratio of the new approach for a discount factor
+    function D(t), e.g. gamma_discount_factor(0.04, 0.03), integrated on fixed nodes (default: fixed_nodes()).
+    D must broadcast t against its schedules, putting the schedule axes first; the outputs have the shape of the
+    schedules plus a trailing axis of delays.
+    """
+    irf = get_irf(irf)
+    t, weights = fixed_nodes() if nodes is None else nodes
+    delay = np.asarray(delay, dtype=float)
+    weighted_irf = weights * irf(t)
+    avoided_emission = discount_factor(t) @ weighted_irf
+    costs_of_release = discount_factor(t + delay[:, np.newaxis]) @ weighted_irf
+    avoided_emission = np.broadcast_to(avoided_emission[..., np.newaxis], costs_of_release.shape)
+    benefits = avoided_emission - costs_of_release
+    return avoided_emission, costs_of_release, benefits, avoided_emission / benefits
+
+
+# %% Grid functions: one row per (schedule, delay) pair, delays varying fastest
+def _grid(schedule_columns, delays, cells):
+    delays = np.asarray(delays)
+    rows = cells[0].size
+    columns = {name: np.repeat(np.asarray(values), len(delays)) for name, values in schedule_columns.items()}
+    columns['Delay'] = np.tile(delays, rows // len(delays))
+    columns.update(zip(NEW_APPROACH_COLUMNS[2:], (x.ravel() for x in cells)))
+    return pd.DataFrame(columns)
+
+
+def piecewise_grid(irf, breakpoints, rates, delays):
+    """
+    New approach results for every (schedule, delay) pair of piecewise-constant schedules, rates of shape
+    (schedules, pieces), e.g. piecewise_grid('joos2013', *GREEN_BOOK, range(10, 201, 10)).
+    """
+    rates = np.atleast_2d(rates)
+    cells = piecewise_cells(irf, breakpoints, rates, delays)
+    return _grid({'Schedule': np.arange(len(rates))}, delays, cells)
+
+
+def gamma_grid(irf, mean_rates, rate_sds, delays):
+    """New approach results with gamma discounting for every (mean rate, rate SD, delay) triple."""
+    irf = get_irf(irf)
+    mean_rates, rate_sds = (x.ravel() for x in np.meshgrid(mean_rates, rate_sds, indexing='ij'))
+    cells = functional_cells(irf, gamma_discount_factor(mean_rates, rate_sds), delays)
+    # D(t) decays like t^(-mean^2 / sd^2): with a constant IRF term the areas are infinite unless mean > sd
+    terms = exp_sum_terms(irf)
+    if terms is not None and np.isinf(terms[1]).any():
+        divergent = (mean_rates <= rate_sds)[:, np.newaxis]
+        cells = tuple(np.where(divergent, np.nan, x) for x in cells)
+    return _grid({'Mean Rate': mean_rates, 'Rate SD': rate_sds}, delays, cells)
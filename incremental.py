@@ -0,0 +1,92 @@
+"""
+This module extends a results store (see results_store.py) to a larger grid without recomputing the cells it
+already holds. The requested (outer, inner) grid is compared with the keys of the store, only the missing cells
+are computed, and the new rows are merged into the store in sort order. Adding one delay to a finished grid of
+time horizons computes one column of cells; the existing rows are only copied into the rewritten column files.
+
+The missing cells are computed with the grid function of the sweep (e.g. sweeps.lashof_grid), one call per
+set of inner values that miss the same outer values, so a rectangular extension takes at most two calls. Rows
+of the store outside the requested grid are kept.
+
+The manifest records the identity of the sweep (see sweep_cache.sweep_identity): a store of another method,
+IRF or pulse is never extended. The new column files are written under new names and the manifest is replaced
+last, so an interrupted extension leaves the previous store readable.
+"""
+
+# Import packages
+import os
+import numpy as np
+import pandas as pd
+from results_store import MANIFEST, read_manifest, read_results, write_manifest, write_results
+from sweep_cache import sweep_identity
+from sweeps import mesh
+
+
+def cell_index(outer, inner):
+    """Index of (outer, inner) cells; the keys are rounded so that discount rates from different aranges match."""
+    return pd.MultiIndex.from_arrays([np.round(np.asarray(outer, dtype=float), 10),
+                                      np.round(np.asarray(inner, dtype=float), 10)])
+
+
+def missing_cells(path, outer, inner):
+    """Boolean (len(outer), len(inner)) array of the grid cells that the store at path does not hold."""
+    outer = np.asarray(outer)
+    inner = np.asarray(inner)
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        return np.ones((len(outer), len(inner)), dtype=bool)
+    keys = read_manifest(path)['columns'][:2]
+    existing = read_results(path, keys)
+    held = cell_index(*mesh(outer, inner)).isin(cell_index(existing[keys[0]], existing[keys[1]]))
+    return ~held.reshape(len(outer), len(inner))
+
+
+def compute_cells(grid_function, irf, outer, inner, missing, **kwargs):
+    """Rows of grid_function for the cells marked in missing, or None if there are none."""
+    patterns = {}
+    for column in range(len(inner)):
+        rows = tuple(np.flatnonzero(missing[:, column]))
+        if rows:
+            patterns.setdefault(rows, []).append(column)
+    frames = [grid_function(irf, outer[list(rows)], inner[columns], **kwargs) for rows, columns in patterns.items()]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def _rewrite(frame, path, manifest, sort_by):
+    """Write frame as the next generation of the column files of a store and remove the previous ones."""
+    generation = manifest.get('generation', 0) + 1
+    frame = frame.sort_values(list(sort_by), kind='stable', ignore_index=True)
+    files = [f'column_{i}_{generation}.npy' for i in range(len(frame.columns))]
+    for file_name, column in zip(files, frame.columns):
+        np.save(os.path.join(path, file_name), frame[column].to_numpy())
+    # The key of a streamed store names the sweep it was computed for (see streaming.py), which the extended
+    # store no longer is, so it is dropped; the identity still holds
+    extra = {key: value for key, value in manifest.items()
+             if key not in ('columns', 'files', 'sort_by', 'rows', 'key')}
+    write_manifest(path, list(frame.columns), files, sort_by, len(frame), **{**extra, 'generation': generation})
+    for file_name in set(manifest['files']) - set(files):
+        os.remove(os.path.join(path, file_name))
+
+
+def extend_grid(grid_function, irf, outer, inner, path, sort_by=None, **kwargs):
+    """
+    Make the store at path (a directory) hold grid_function(irf, outer, inner, **kwargs), e.g. sweeps.lashof_grid,
+    computing only the cells it does not hold yet; a missing store is created. New stores are sorted by sort_by
+    (default: the inner column, then the outer one, as in models.py). Returns the number of computed rows.
+    """
+    outer = np.asarray(outer)
+    inner = np.asarray(inner)
+    identity = sweep_identity(grid_function, irf, **kwargs)
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        frame = grid_function(irf, outer, inner, **kwargs)
+        write_results(frame, path, sort_by or list(frame.columns[1::-1]), identity=identity)
+        return len(frame)
+
+    manifest = read_manifest(path)
+    if manifest.get('identity') != identity:
+        raise ValueError(f'The store at {path} holds another sweep than {grid_function.__name__} of this IRF')
+    new = compute_cells(grid_function, irf, outer, inner, missing_cells(path, outer, inner), **kwargs)
+    if new is None:
+        return 0
+    frame = pd.concat([read_results(path), new], ignore_index=True)
+    _rewrite(frame, path, manifest, manifest['sort_by'] or manifest['columns'][1::-1])
+    return len(new)
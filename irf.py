@@ -0,0 +1,101 @@
+"""
+This module defines the Impulse Response Functions (IRF) used in the analysis as compact coefficient and time
+constant arrays, and keeps them in a registry so that the sweeps, the analytic integration and the plots all
+dispatch on the same objects. The registered IRFs are:
+- 'joos2013': IRF as formulated in Joos et al. (2013), in percent of the pulse (models.py)
+- 'joos2013_co2': variant with the persistent fraction split into 5500, 8200 and 200000-year terms, in
+  fractions of the pulse (models_complete.py)
+- 'ipcc1990': IRF as formulated in IPCC (1990)
+"""
+
+# Import packages
+import numpy as np
+from analytic_integration import exp_sum_value, exp_sum_area, cumulative_area
+from profiling import count
+
+
+class IRF:
+    """
+    IRF written as a sum of exponentials, IRF(t) = sum_i a_i * exp(-t / tau_i); a constant term has tau = inf.
+
+    Calling the object evaluates the IRF, area() and cumulative_area() integrate it in closed form.
+    """
+
+    def __init__(self, name, coefficients, taus, description=''):
+        self.name = name
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.taus = np.asarray(taus, dtype=float)
+        self.description = description
+
+    @classmethod
+    def from_terms(cls, name, terms, description=''):
+        """
+        Build an IRF from (coefficient, tau) pairs, where tau may itself be a list of (weight, tau) sub-terms
+        sharing the coefficient, e.g. (0.217, [(0.54, 5500), (0.14, 8200), (0.32, 200000)]).
+        """
+        coefficients, taus = [], []
+        for coefficient, tau in terms:
+            sub_terms = tau if np.ndim(tau) else [(1.0, tau)]
+            for weight, sub_tau in sub_terms:
+                coefficients.append(coefficient * weight)
+                taus.append(sub_tau)
+        return cls(name, coefficients, taus, description)
+
+    @property
+    def terms(self):
+        return list(zip(self.coefficients, self.taus))
+
+    def __call__(self, t):
+        count(self.name, np.size(t))
+        return exp_sum_value(self.coefficients, self.taus, t)
+
+    def discounted(self, t, t_disc, r):
+        """IRF(t) * exp(-r * t_disc), the discounted damage DD(t, t_disc, r) of the new approach."""
+        count(f'{self.name}.discounted', np.size(t))
+        return exp_sum_value(self.coefficients, self.taus, t) * np.exp(-r * np.asarray(t_disc))
+
+    def area(self, start, end=np.inf, r=0.0, shift=0.0):
+        """Area under IRF(t) * exp(-r * (t + shift)) over [start, end]."""
+        return exp_sum_area(self.coefficients, self.taus, start, end, r, shift)
+
+    def cumulative_area(self, times):
+        """Area under the IRF from 0 to each of times."""
+        return cumulative_area(self, times)
+
+    def __repr__(self):
+        return f'IRF({self.name!r}, coefficients={self.coefficients.tolist()}, taus={self.taus.tolist()})'
+
+
+# %% Registry
+IRFS = {}
+
+
+def register_irf(irf):
+    IRFS[irf.name] = irf
+    return irf
+
+
+def get_irf(irf):
+    """
+    Resolve a registry name to its IRF and wrap a list of (coefficient, tau) pairs into an IRF; IRF objects
+    and other callables pass through.
+    """
+    if isinstance(irf, str):
+        return IRFS[irf]
+    if not callable(irf):
+        return IRF.from_terms('custom', irf)
+    return irf
+
+
+JOOS_2013 = register_irf(IRF.from_terms(
+    'joos2013', [(21.73, np.inf), (22.4, 394.4), (28.24, 36.54), (27.63, 4.304)],
+    'Joos et al. (2013), percent of the pulse remaining in the atmosphere'))
+
+JOOS_2013_CO2 = register_irf(IRF.from_terms(
+    'joos2013_co2', [(0.217, [(0.54, 5500), (0.14, 8200), (0.32, 200000)]), (0.186, 1.186), (0.338, 18.51),
+                     (0.259, 172.9)],
+    'Joos et al. (2013) variant with the persistent fraction decaying on 5500, 8200 and 200000 years'))
+
+IPCC_1990 = register_irf(IRF.from_terms(
+    'ipcc1990', [(0.30036, 6.6993), (0.34278, 71.109), (0.35686, 815.727)],
+    'IPCC (1990), fraction of the pulse remaining in the atmosphere'))
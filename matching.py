@@ -0,0 +1,169 @@
+"""
+This module matches the new approach with the Lashof method: for every (time horizon, delay) cell it finds the
+discount rate whose new approach equivalence ratio equals the Lashof ratio. With a constant rate the ratio of
+the new approach is 1 / (1 - exp(-r * delay)) for any IRF, so the equation ER(r) = Lashof ER is inverted in
+closed form for all cells at once instead of scanning a discretized rate grid. find_root, a vectorized
+bracketing solver, serves the equations without an inverse (see contours.py).
+"""
+
+# Import packages
+import numpy as np
+import pandas as pd
+from profiling import count, progress, stage
+from sweeps import new_approach_cells
+
+
+def find_root(func, target, lower, upper, xtol=1e-14, rtol=1e-12, max_iter=200, derivative=False):
+    """
+    Solve func(x) = target element-wise for a monotone func, with the root bracketed by [lower, upper].
+
+    func is called with an array of the broadcast shape of target, lower and upper and must return an array of
+    the same shape. The bracket is shrunk with the Illinois variant of regula falsi, which converges
+    superlinearly without derivatives. With derivative True, func returns the values and their derivatives
+    (see sensitivities.py), and the next point is the Newton step from the latest point wherever that step
+    stays inside the bracket and at least halves the previous step; a cell also stops when its Newton step is
+    within the tolerance. Returns the roots and the residuals func(root) - target; cells whose bracket does not
+    contain a root are NaN.
+    """
+    def evaluate(x):
+        if derivative:
+            values, slopes = func(x)
+            return values - target, slopes
+        return func(x) - target, None
+
+    target, lower, upper = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (target, lower, upper)))
+    lower, upper = lower.copy(), upper.copy()
+    f_lower, slope_lower = evaluate(lower)
+    f_upper, slope_upper = evaluate(upper)
+    bracketed = np.sign(f_lower) * np.sign(f_upper) <= 0
+    root = np.where(f_lower == 0, lower, upper)
+    side = np.zeros(target.shape, dtype=int)
+    if derivative:
+        # Newton starts from the end nearer to the root
+        from_lower = np.abs(f_lower) <= np.abs(f_upper)
+        point = np.where(from_lower, lower, upper)
+        f_point = np.where(from_lower, f_lower, f_upper)
+        slope = np.where(from_lower, slope_lower, slope_upper)
+        last_step = upper - lower
+        converged = np.zeros(target.shape, dtype=bool)
+    for _ in range(max_iter):
+        active = bracketed & (f_lower != 0) & (f_upper != 0) & (upper - lower > xtol + rtol * np.abs(root))
+        if derivative:
+            active &= ~converged
+        if not active.any():
+            break
+        count('find_root iterations', active.sum())
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            candidate = (lower * f_upper - upper * f_lower) / (f_upper - f_lower)
+            # Fall back to bisection where the secant step leaves the bracket
+            outside = ~((candidate > lower) & (candidate < upper))
+            candidate = np.where(outside, (lower + upper) / 2, candidate)
+            if derivative:
+                newton = point - f_point / slope
+                step = np.abs(newton - point)
+                use_newton = (newton > lower) & (newton < upper) & (step <= last_step / 2)
+                candidate = np.where(use_newton, newton, candidate)
+                last_step = np.where(active, np.abs(candidate - point), last_step)
+                converged |= active & use_newton & (step <= xtol + rtol * np.abs(newton))
+        root = np.where(active, candidate, root)
+        f_root, slope_root = evaluate(root)
+        if derivative:
+            point = np.where(active, root, point)
+            f_point = np.where(active, f_root, f_point)
+            slope = np.where(active, slope_root, slope)
+        # Keep the sub-interval that still brackets the root; when the same end is kept twice in a row its
+        # function value is halved (Illinois), which avoids the one-sided convergence of plain regula falsi
+        replace_upper = active & (np.sign(f_root) == np.sign(f_upper))
+        replace_lower = active & ~replace_upper
+        f_lower = np.where(replace_upper & (side == 1), f_lower / 2, f_lower)
+        f_upper = np.where(replace_lower & (side == -1), f_upper / 2, f_upper)
+        upper = np.where(replace_upper, root, upper)
+        f_upper = np.where(replace_upper, f_root, f_upper)
+        lower = np.where(replace_lower, root, lower)
+        f_lower = np.where(replace_lower, f_root, f_lower)
+        side = np.where(replace_upper, 1, np.where(replace_lower, -1, side))
+    root = np.where(bracketed, root, np.nan)
+    return root, evaluate(root)[0]
+
+
+def solve_discount_rate(irf, target_ratio, delay, rate_bounds=(1e-8, 10.0)):
+    """
+    Discount rate at which the new approach equivalence ratio of the IRF equals target_ratio, for arrays of
+    target ratios and delays. Returns the rates and the residuals of the ratio. The ratio tends to 1 as the
+    rate grows, so targets of 1 or less (e.g. time horizon equal to the delay) get an infinite rate; rates
+    outside rate_bounds are NaN.
+
+    With a constant rate the ratio is 1 / (1 - exp(-r * delay)) for any IRF (see sensitivities.py), so the rate
+    is its exact inverse, r = -log(1 - 1 / target_ratio) / delay, and the residual is that of the ratio of the
+    IRF at this rate.
+    """
+    target_ratio, delay = np.broadcast_arrays(np.asarray(target_ratio, dtype=float), np.asarray(delay, dtype=float))
+    at_limit = target_ratio <= 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = -np.log1p(-1 / np.where(at_limit, np.inf, target_ratio)) / delay
+    rates = np.where((rates >= rate_bounds[0]) & (rates <= rate_bounds[1]), rates, np.nan)
+    residuals = new_approach_cells(irf, rates, delay)[3] - target_ratio
+    return np.where(at_limit, np.inf, rates), np.where(at_limit, 0.0, residuals)
+
+
+def best_discount_rates(lashof, irf='joos2013', rate_bounds=(1e-8, 10.0)):
+    """
+    Best discount rate for every (time horizon, delay) row of a Lashof results frame (as in lashof_JOOS.csv),
+    with the columns of results_analysis2.csv. 'Smallest Difference' is the absolute residual of the ratio.
+    """
+    with stage('matching'):
+        rates, residuals = solve_discount_rate(irf, lashof['Equivalence Ratio'].to_numpy(),
+                                               lashof['Delay (years)'].to_numpy(), rate_bounds)
+    return pd.DataFrame({
+        'Time Horizon (years)': lashof['Time Horizon (years)'].to_numpy(),
+        'Delay (years)': lashof['Delay (years)'].to_numpy(),
+        'Best Discount Rate': rates,
+        'Smallest Difference': np.abs(residuals)
+    })
+
+
+def best_time_horizons(new_approach, lashof):
+    """
+    Best time horizon for every (discount rate, delay) row of a new approach frame (as in new_approach.csv):
+    the Lashof time horizon, at the same delay, whose equivalence ratio is nearest to the new approach one.
+    Returns the columns of results_analysis.csv; rows whose delay has no Lashof result are dropped and ties go
+    to the Lashof row that comes first, as in the original loop.
+
+    The Lashof ratios are grouped by delay and sorted once, and all new approach ratios of a delay are looked up
+    together with searchsorted.
+    """
+    lashof_delays = lashof['Delay (years)'].to_numpy()
+    lashof_ratios = lashof['Equivalence Ratio'].to_numpy(dtype=float)
+    lashof_horizons = lashof['Time Horizon (years)'].to_numpy()
+    rates = new_approach['Discount Rate'].to_numpy()
+    delays = new_approach['Delay'].to_numpy()
+    ratios = new_approach['Equivalence ratio'].to_numpy(dtype=float)
+
+    best_horizons = np.zeros(len(new_approach), dtype=lashof_horizons.dtype)
+    differences = np.full(len(new_approach), np.nan)
+    matched = np.isin(delays, lashof_delays)
+    for delay in progress(np.unique(delays[matched]), 'matching delays'):
+        # Lashof rows of this delay sorted by ratio, equal ratios kept in their original order
+        rows = np.flatnonzero(lashof_delays == delay)
+        rows = rows[np.argsort(lashof_ratios[rows], kind='stable')]
+        sorted_ratios = lashof_ratios[rows]
+        queries = np.flatnonzero(matched & (delays == delay))
+        query_ratios = ratios[queries]
+        # Nearest neighbours on both sides; a left neighbour is moved to the first row of its run of equal ratios
+        right = np.clip(np.searchsorted(sorted_ratios, query_ratios, side='left'), 0, len(rows) - 1)
+        left = np.clip(right - 1, 0, None)
+        left = np.searchsorted(sorted_ratios, sorted_ratios[left], side='left')
+        left_difference = np.abs(query_ratios - sorted_ratios[left])
+        right_difference = np.abs(query_ratios - sorted_ratios[right])
+        take_left = (left_difference < right_difference) | \
+                    ((left_difference == right_difference) & (rows[left] < rows[right]))
+        nearest = np.where(take_left, left, right)
+        best_horizons[queries] = lashof_horizons[rows[nearest]]
+        differences[queries] = np.where(take_left, left_difference, right_difference)
+
+    return pd.DataFrame({
+        'Discount Rate': rates[matched],
+        'Delay': delays[matched],
+        'Best Time Horizon': best_horizons[matched],
+        'Smallest Difference': differences[matched]
+    })
@@ -5,214 +5,271 @@ and Lashof approaches applied to both IRF versions for different time horizons a
 it defines and adopts a new approach that uses discount rates instead of time horizons to ensure the integrals
 of Joos 2013 are finite. The script calculates benefits, costs, and equivalence ratios for various delays and
 discount rates. It saves the results to CSV files for further analysis.
+
+Importing the module computes nothing: the results are attributes of Models, computed on first access and
+memoized, and only running the module as a script (python models.py) computes and saves all of them.
 """
 
 # Import packages
-import numpy as np
 import os
-from scipy.integrate import quad
-from functools import partial
+from functools import cached_property
+import numpy as np
 import pandas as pd
+from analytic_integration import integrate
+from diagnostics import save_diagnostics
+from irf import get_irf
+from profiling import Profiler, progress, stage
+from sweep_cache import SweepCache, sweep_identity
+from incremental import extend_grid
+from results_store import write_results
+from sensitivities import save_sensitivities
+from streaming import stream_grid
+from sweeps import moura_costa_grid, lashof_grid, new_approach_grid
+from uncertainty import percentile_bands
 
 # Define the directory path
 directory_path = r'C:\thesis\python'
 
-# %% NEW APPROACH ON IRF JOOS 2013
-# Define the equation DD(t): IRF as formulated in Joos et al. (2013)
-def DD(t, t_disc, r):
-    term1 = 21.73 * np.exp(-r * t_disc)
-    term2 = 22.4 * np.exp(-t / 394.4) * np.exp(-r * t_disc)
-    term3 = 28.24 * np.exp(-t / 36.54) * np.exp(-r * t_disc)
-    term4 = 27.63 * np.exp(-t / 4.304) * np.exp(-r * t_disc)
-    return term1 + term2 + term3 + term4
-
-# Function to integrate for line 1 (benefit from delayed emission)
-def integrand_line1(t, r):
-    return DD(t, t, r)
-
-# Function to integrate for line 2 (costs of release)
-def integrand_line2(t, delay, r):
-    t_disc = t + delay
-    return DD(t, t_disc, r)
-
-# Prepare to collect results
-results = []
-
-# Loop through discount rates and delays
-for r in np.arange(0.001, 0.031, 0.0005):
-    for delay in range(10, 201, 10):
-        # Fix the discount rate and delay for the integrand functions using partial
-        integrand_line1_fixed = partial(integrand_line1, r=r)
-        integrand_line2_fixed = partial(integrand_line2, delay=delay, r=r)
-
-        # Calculate the area under line 1 from 0 to infinity
-        avoided_emission, error1 = quad(integrand_line1_fixed, 0, np.inf)
-
-        # Calculate the area under line 2 from 0 to infinity
-        costs_of_release, error2 = quad(integrand_line2_fixed, 0, np.inf)
-
-        # Calculate the equivalence
-        benefits = avoided_emission - costs_of_release
-        equivalence = avoided_emission / benefits
-
-        # Append results to the list
-        results.append({'Discount Rate': r, 'Delay': delay, 'Avoided Emission': avoided_emission,
-                        'Costs of Release': costs_of_release, 'Benefits': benefits, 'Equivalence ratio': equivalence})
-
-# Convert results to a DataFrame
-results_df = pd.DataFrame(results)
-results_df.to_csv(os.path.join(directory_path, 'new_approach.csv'), index=False)
-
-# %%
-'''
-OLD APPROACHES ON IRF JOOS 2013
-Both MC and Lashof require areas to be finite therefore we adopt time horizons
-'''
-
-# Define the UD (Undiscounted Damage) function
-def UD(t):
-    return 21.73 + 22.4 * np.exp(-t / 394.4) + 28.24 * np.exp(-t / 36.54) + 27.63 * np.exp(-t / 4.304)
-
-# Initialize lists to store the results
-moura_costa_results = []
-lashof_results = []
-
-#%% Vary delay and time horizon for Moura-Costa method
-
-for time_horizon in range(50, 10000, 50):
-    for delay in range(10, 210, 10):
-        if time_horizon < delay:
-            area_under_UD = float('nan')
-            benefits_MC = float('nan')
-            equivalence_ratio = float('nan')
-        else:
-            benefits_MC = delay * 100  # ton-years
-            area_under_UD, error = quad(UD, 0, time_horizon)
-            equivalence_ratio = area_under_UD / benefits_MC
-        moura_costa_results.append([time_horizon, delay, area_under_UD, benefits_MC, equivalence_ratio])
-
-#%% Vary delay and time horizon for Lashof method
-
-for time_horizon in range(50, 10050, 50):
-    for delay in range(10, 210, 10):
-        if time_horizon < delay:
-            equivalence_ratio = float('nan')
-            costs_Lashof = float('nan')
-            benefits_Lashof = float('nan')
-        else:
-            area_under_UD, error = quad(UD, 0, time_horizon)
-            area_under_UD_DELAYED, error = quad(UD, 0, time_horizon - delay)
-            costs_Lashof = area_under_UD
-            benefits_Lashof = area_under_UD - area_under_UD_DELAYED
-            equivalence_ratio = costs_Lashof / benefits_Lashof
-        lashof_results.append([time_horizon, delay, costs_Lashof, benefits_Lashof, equivalence_ratio])
-
-# Convert results to dataframes
-moura_costa_joos = pd.DataFrame(moura_costa_results,
-                              columns=['Time Horizon (years)', 'Delay (years)', 'Costs (ton-years)', 'Benefits (ton-years)',
-                                       'Equivalence Ratio'])
-lashof_joos = pd.DataFrame(lashof_results,
-                         columns=['Time Horizon (years)', 'Delay (years)', 'Costs (ton-years)', 'Benefits (ton-years)',
-                                  'Equivalence Ratio'])
-
-# Save the dataframes to CSV files
-file_name = 'moura_costa_JOOS.csv'
-moura_costa_joos.to_csv(f'{directory_path}\\{file_name}', index=False)
-file_name = 'lashof_JOOS.csv'
-lashof_joos.to_csv(f'{directory_path}\\{file_name}', index=False)
-
-# %% Compute the results for time horizon 100,000 for Lashof method
-time_horizon = 100000
-lashof_results_100k = []
-
-for delay in range(10, 210, 10):
-# for delay in (500, 1000):
-    if time_horizon < delay:
-        equivalence_ratio = float('nan')
-        costs_Lashof = float('nan')
-        benefits_Lashof = float('nan')
-    else:
-        area_under_UD, error = quad(UD, 0, time_horizon)
-        area_under_UD_DELAYED, error = quad(UD, 0, time_horizon - delay)
-        costs_Lashof = area_under_UD
-        benefits_Lashof = area_under_UD - area_under_UD_DELAYED
-        equivalence_ratio = costs_Lashof / benefits_Lashof
-    lashof_results_100k.append([time_horizon, delay, costs_Lashof, benefits_Lashof, equivalence_ratio])
-
-# Convert results to dataframe and save
-lashof_results_100k = pd.DataFrame(lashof_results_100k,
-                              columns=['Time Horizon (years)', 'Delay (years)', 'Costs (ton-years)', 'Benefits (ton-years)',
-                                       'Equivalence Ratio'])
-file_name = 'lashof_100k.csv'
-# file_name = 'biochar1000lashof_100k.csv'
-lashof_results_100k.to_csv(f'{directory_path}\\{file_name}', index=False)
-
-
-# %%
-'''
-OLD APPROACHES ON IRF IPCC 1990
-Still adopting time horizons, Lashof always requires time horizons, the ER that is obtained by Moura-Costa whn the TH 
-is extended to infinite is calculated.
-'''
-
-# Define the function A(t): IRF as formulated in IPCC (1990)
-def A(t):
-    return 0.30036 * np.exp(-t / 6.6993) + 0.34278 * np.exp(-t / 71.109) + 0.35686 * np.exp(-t / 815.727)
-
-# Vary delay for Moura-Costa to infinite
-area_under_A_inf, error = quad(A, 0, np.inf)  # Integrate A(t) over the range from 0 to infinity
-print(f"The area under IRF (IPCC1990) from 0 to infinity is {area_under_A_inf:.2f} ton-years.")
-moura_costa_results_to_infinite = []
-for delay in range(10, 210, 10):
-    benefits_MC = delay  # ton-years
-    equivalence_ratio = area_under_A_inf / benefits_MC
-    moura_costa_results_to_infinite.append([delay, area_under_A_inf, benefits_MC, equivalence_ratio])
-
-# Convert the list to a DataFrame
-moura_costa_results_to_infinite = pd.DataFrame(moura_costa_results_to_infinite, columns=['delay', 'area_under_A_inf', 'benefits_MC', 'equivalence_ratio'])
-# Save the dataframes to CSV files
-moura_costa_results_to_infinite.to_csv(os.path.join(directory_path, 'moura_costa_infinite.csv'), index=False)
-
-# Initialize lists to store the results
-moura_costa_results = []
-lashof_results = []
-
-# Vary delay for Moura-Costa method from 10 to 100 years (every 10 years)
-for time_horizon in range(100, 10000, 200):
-    for delay in range(10, 210, 10):
-        if time_horizon < delay:
-            area_under_A = float('nan')
-            benefits_MC = float('nan')
-            equivalence_ratio = float('nan')
-        else:
-            area_under_A, error = quad(A, 0, time_horizon)
-            benefits_MC = delay  # ton-years
-            equivalence_ratio = area_under_A / benefits_MC
-        moura_costa_results.append([time_horizon, delay, area_under_A, benefits_MC, equivalence_ratio])
-
-# Vary time horizon for Lashof method from 100 to 10000 years (every 200 years) and delays from 10 to 100 (every 10 years)
-for time_horizon in range(100, 10200, 200):
-    for delay in range(10, 210, 10):
-        if time_horizon < delay:
-            equivalence_ratio = float('nan')
-            costs_Lashof = float('nan')
-            benefits_Lashof = float('nan')
-        else:
-            area_under_A, error = quad(A, 0, time_horizon)
-            area_under_A_DELAYED, error = quad(A, 0, time_horizon - delay)
-            costs_Lashof = area_under_A
-            benefits_Lashof = area_under_A - area_under_A_DELAYED
-            equivalence_ratio = costs_Lashof / benefits_Lashof
-        lashof_results.append([time_horizon, delay, costs_Lashof, benefits_Lashof, equivalence_ratio])
-
-# Convert results to dataframes
-moura_costa_IPCC = pd.DataFrame(moura_costa_results,
-                              columns=['Time Horizon (years)','Delay (years)', 'Costs (ton-years)', 'Benefits (ton-years)',
-                                       'Equivalence Ratio'])
-lashof_IPCC = pd.DataFrame(lashof_results,
-                         columns=['Time Horizon (years)', 'Delay (years)', 'Costs (ton-years)', 'Benefits (ton-years)',
-                                  'Equivalence Ratio'])
-
-# Save the dataframes to CSV files
-moura_costa_IPCC.to_csv(os.path.join(directory_path, 'moura_costa_IPCC1990.csv'), index=False)
-lashof_IPCC.to_csv(os.path.join(directory_path, 'lashof_IPCC1990.csv'), index=False)
\ No newline at end of file
+# Next to every CSV the sweep is also saved as a columnar store (see results_store.py), sorted by delay first
+# since the plots select delays
+time_horizon_sort = ['Delay (years)', 'Time Horizon (years)']
+
+
+def save_csv(frame, path):
+    # The frame is computed before the 'csv' stage starts, so the stage only times the writing (see profiling.py)
+    with stage('csv'):
+        frame.to_csv(path, index=False)
+
+
+class Models:
+    """
+    Results of the analysis for one Joos et al. (2013) IRF variant, each computed on first access. The Joos
+    Moura-Costa pulse is 100 for 'joos2013' (in percent of the pulse) and 1 for 'joos2013_co2'. With diagnostics
+    True, save() also writes the quadrature diagnostics of every sweep (see diagnostics.py), and with gradients
+    True the derivatives of the equivalence ratios in every cell (see sensitivities.py). The percentile bands of
+    the ratios over the IRF parameters (see uncertainty.py) are only computed when spreads, the relative ranges
+    (amplitude_spread, tau_spread) of the parameters, are given; save() then writes them as well. With
+    lashof_1year True, save() also streams the Lashof results at 1-year resolution up to 100,000 years (about
+    150 MB of stores, see save_lashof_1year).
+    """
+
+    def __init__(self, directory=directory_path, joos_irf='joos2013', moura_costa_pulse=100, diagnostics=False,
+                 gradients=False, spreads=None, lashof_1year=False):
+        self.directory = directory
+        self.joos_irf = joos_irf
+        self.moura_costa_pulse = moura_costa_pulse
+        self.diagnostics = diagnostics
+        self.gradients = gradients
+        self.spreads = spreads
+        self.lashof_1year = lashof_1year
+
+    @cached_property
+    def cache(self):
+        # Sweeps are cached by IRF parameters, method and grid, so re-running with unchanged inputs reads them back
+        return SweepCache(os.path.join(self.directory, 'sweep_cache'))
+
+    # %% NEW APPROACH ON IRF JOOS 2013
+    # IRF as formulated in Joos et al. (2013), see irf.py. DD(t, t_disc, r) is the IRF discounted with
+    # exp(-r * t_disc): line 1 (benefit from delayed emission) is DD(t, t, r) and line 2 (costs of release) is
+    # DD(t, t + delay, r), and the areas under both lines are computed in closed form from the IRF coefficients
+    @cached_property
+    def JOOS(self):
+        return get_irf(self.joos_irf)
+
+    @property
+    def DD(self):
+        return self.JOOS.discounted
+
+    @cached_property
+    def new_approach(self):
+        # All discount rates and delays in one batched call
+        return self.cache.sweep('new_approach', self.JOOS, np.arange(0.001, 0.031, 0.0005), range(10, 201, 10))
+
+    # %% OLD APPROACHES ON IRF JOOS 2013
+    # Both MC and Lashof require areas to be finite therefore we adopt time horizons
+
+    # The UD (Undiscounted Damage) function
+    @property
+    def UD(self):
+        return self.JOOS
+
+    @cached_property
+    def moura_costa_joos(self):
+        # Vary delay and time horizon for Moura-Costa method (ton-years)
+        return self.cache.sweep('moura_costa', self.UD, range(50, 10000, 50), range(10, 210, 10),
+                                pulse=self.moura_costa_pulse)
+
+    @cached_property
+    def lashof_joos(self):
+        # Vary delay and time horizon for Lashof method
+        return self.cache.sweep('lashof', self.UD, range(50, 10050, 50), range(10, 210, 10))
+
+    @cached_property
+    def lashof_100k(self):
+        # Results for time horizon 100,000 for Lashof method
+        return self.cache.sweep('lashof', self.UD, [100000], range(10, 210, 10))
+
+    # Uncertainty of the IRF parameters: 5th, 50th and 95th percentiles of the equivalence ratios over 10,000
+    # parameter sets drawn around those of Joos et al. (2013) within self.spreads, see uncertainty.py
+    @property
+    def parameter_spreads(self):
+        if self.spreads is None:
+            raise ValueError('The percentile bands need the ranges of the IRF parameters: pass '
+                             'spreads=(amplitude_spread, tau_spread) to Models')
+        return self.spreads
+
+    @cached_property
+    def moura_costa_joos_bands(self):
+        return percentile_bands('moura_costa', self.UD, range(50, 10000, 50), range(10, 210, 10),
+                                *self.parameter_spreads, n_samples=10000, pulse=self.moura_costa_pulse, seed=2013)
+
+    @cached_property
+    def lashof_joos_bands(self):
+        return percentile_bands('lashof', self.UD, range(50, 10050, 50), range(10, 210, 10), *self.parameter_spreads,
+                                n_samples=10000, seed=2013)
+
+    # %% OLD APPROACHES ON IRF IPCC 1990
+    # Still adopting time horizons, Lashof always requires time horizons, the ER that is obtained by Moura-Costa whn
+    # the TH is extended to infinite is calculated.
+
+    # The function A(t): IRF as formulated in IPCC (1990), see irf.py
+    @cached_property
+    def A(self):
+        return get_irf('ipcc1990')
+
+    @cached_property
+    def area_under_A_inf(self):
+        # Integrate A(t) over the range from 0 to infinity
+        return integrate(self.A, 0, np.inf)
+
+    @cached_property
+    def moura_costa_infinite(self):
+        # Vary delay for Moura-Costa to infinite
+        delays = np.arange(10, 210, 10)
+        benefits_MC = delays  # ton-years
+        return pd.DataFrame({'delay': delays, 'area_under_A_inf': self.area_under_A_inf, 'benefits_MC': benefits_MC,
+                             'equivalence_ratio': self.area_under_A_inf / benefits_MC})
+
+    @cached_property
+    def moura_costa_IPCC(self):
+        # Vary delay for Moura-Costa method from 10 to 100 years (every 10 years), ton-years
+        return self.cache.sweep('moura_costa', self.A, range(100, 10000, 200), range(10, 210, 10), pulse=1)
+
+    @cached_property
+    def lashof_IPCC(self):
+        # Vary time horizon for Lashof method from 100 to 10000 years (every 200 years) and delays from 10 to 100
+        # (every 10 years)
+        return self.cache.sweep('lashof', self.A, range(100, 10200, 200), range(10, 210, 10))
+
+    # %% Saving
+    def save_new_approach(self):
+        save_csv(self.new_approach, os.path.join(self.directory, 'new_approach.csv'))
+        write_results(self.new_approach, os.path.join(self.directory, 'new_approach'),
+                      sort_by=['Delay', 'Discount Rate'], identity=sweep_identity(new_approach_grid, self.JOOS))
+
+    def save_moura_costa_joos(self):
+        file_name = 'moura_costa_JOOS.csv'
+        save_csv(self.moura_costa_joos, os.path.join(self.directory, file_name))
+        write_results(self.moura_costa_joos, os.path.join(self.directory, 'moura_costa_JOOS'),
+                      sort_by=time_horizon_sort,
+                      identity=sweep_identity(moura_costa_grid, self.UD, pulse=self.moura_costa_pulse))
+
+    def save_lashof_joos(self):
+        file_name = 'lashof_JOOS.csv'
+        save_csv(self.lashof_joos, os.path.join(self.directory, file_name))
+        write_results(self.lashof_joos, os.path.join(self.directory, 'lashof_JOOS'), sort_by=time_horizon_sort,
+                      identity=sweep_identity(lashof_grid, self.UD))
+
+    def save_lashof_100k(self):
+        file_name = 'lashof_100k.csv'
+        save_csv(self.lashof_100k, os.path.join(self.directory, file_name))
+        write_results(self.lashof_100k, os.path.join(self.directory, 'lashof_100k'), sort_by=time_horizon_sort,
+                      identity=sweep_identity(lashof_grid, self.UD))
+
+    def save_uncertainty(self):
+        save_csv(self.moura_costa_joos_bands, os.path.join(self.directory, 'moura_costa_JOOS_uncertainty.csv'))
+        save_csv(self.lashof_joos_bands, os.path.join(self.directory, 'lashof_JOOS_uncertainty.csv'))
+
+    def save_ipcc(self):
+        save_csv(self.moura_costa_infinite, os.path.join(self.directory, 'moura_costa_infinite.csv'))
+        save_csv(self.moura_costa_IPCC, os.path.join(self.directory, 'moura_costa_IPCC1990.csv'))
+        save_csv(self.lashof_IPCC, os.path.join(self.directory, 'lashof_IPCC1990.csv'))
+        write_results(self.moura_costa_IPCC, os.path.join(self.directory, 'moura_costa_IPCC1990'),
+                      sort_by=time_horizon_sort, identity=sweep_identity(moura_costa_grid, self.A, pulse=1))
+        write_results(self.lashof_IPCC, os.path.join(self.directory, 'lashof_IPCC1990'), sort_by=time_horizon_sort,
+                      identity=sweep_identity(lashof_grid, self.A))
+
+    def save_lashof_1year(self):
+        # LASHOF AT 1-YEAR RESOLUTION UP TO 100,000 YEARS
+        # These grids do not fit in memory as a single DataFrame, so they are written chunk by chunk into columnar
+        # stores (read them with results_store.read_results). An interrupted run resumes from the last complete
+        # chunk.
+        for irf_name, irf in [('JOOS', self.UD), ('IPCC1990', self.A)]:
+            stream_grid(lashof_grid, irf, np.arange(1, 100001), range(10, 210, 10),
+                        os.path.join(self.directory, f'lashof_{irf_name}_1year'), chunk_size=5000)
+
+    def save_diagnostics(self):
+        # Error estimates, integrand evaluations, warnings and wall time of quad for every cell of the sweeps,
+        # saved next to the CSV files as {name}_diagnostics.csv
+        save_diagnostics('new_approach', self.JOOS, np.arange(0.001, 0.031, 0.0005), range(10, 201, 10),
+                         self.directory, 'new_approach')
+        save_diagnostics('moura_costa', self.UD, range(50, 10000, 50), range(10, 210, 10), self.directory,
+                         'moura_costa_JOOS')
+        save_diagnostics('lashof', self.UD, range(50, 10050, 50), range(10, 210, 10), self.directory, 'lashof_JOOS')
+        save_diagnostics('lashof', self.UD, [100000], range(10, 210, 10), self.directory, 'lashof_100k')
+        save_diagnostics('moura_costa', self.A, range(100, 10000, 200), range(10, 210, 10), self.directory,
+                         'moura_costa_IPCC1990')
+        save_diagnostics('lashof', self.A, range(100, 10200, 200), range(10, 210, 10), self.directory,
+                         'lashof_IPCC1990')
+
+    def save_gradients(self):
+        # dER/dTH and dER/ddelay (Moura-Costa, Lashof) or dER/dr and dER/ddelay (new approach) of every cell of the
+        # sweeps, saved next to the CSV files as {name}_gradients.csv
+        save_sensitivities('new_approach', self.JOOS, np.arange(0.001, 0.031, 0.0005), range(10, 201, 10),
+                           self.directory, 'new_approach')
+        save_sensitivities('moura_costa', self.UD, range(50, 10000, 50), range(10, 210, 10), self.directory,
+                           'moura_costa_JOOS', pulse=self.moura_costa_pulse)
+        save_sensitivities('lashof', self.UD, range(50, 10050, 50), range(10, 210, 10), self.directory, 'lashof_JOOS')
+        save_sensitivities('lashof', self.UD, [100000], range(10, 210, 10), self.directory, 'lashof_100k')
+        save_sensitivities('moura_costa', self.A, range(100, 10000, 200), range(10, 210, 10), self.directory,
+                           'moura_costa_IPCC1990', pulse=1)
+        save_sensitivities('lashof', self.A, range(100, 10200, 200), range(10, 210, 10), self.directory,
+                           'lashof_IPCC1990')
+
+    # %% Extending saved results
+    # The stores written above record the sweep they hold, so they can be extended to more delays or time horizons
+    # with only the new cells computed (see incremental.py)
+    def extend_lashof_100k(self, delays):
+        """Add delays to the Lashof store at 100,000 years, e.g. (500, 1000) for biochar."""
+        return extend_grid(lashof_grid, self.UD, [100000], delays, os.path.join(self.directory, 'lashof_100k'))
+
+    def extend_lashof_joos(self, time_horizons, delays):
+        """Extend the Lashof store of the Joos IRF to the grid of time horizons and delays."""
+        return extend_grid(lashof_grid, self.UD, time_horizons, delays, os.path.join(self.directory, 'lashof_JOOS'))
+
+    def save(self):
+        """Compute and save all the results (the batch run of python models.py)."""
+        steps = [self.save_new_approach, self.save_moura_costa_joos, self.save_lashof_joos, self.save_lashof_100k,
+                 self.save_ipcc]
+        if self.lashof_1year:
+            steps.append(self.save_lashof_1year)
+        if self.spreads is not None:
+            steps.append(self.save_uncertainty)
+        if self.diagnostics:
+            steps.append(self.save_diagnostics)
+        if self.gradients:
+            steps.append(self.save_gradients)
+        # Every step is a stage of the profile, and the progress line counts the steps (see profiling.py)
+        for step in progress(steps, 'models.py'):
+            with stage(step.__name__):
+                step()
+
+
+if __name__ == '__main__':
+    # Profile the run: progress on stderr, and the time and memory of every stage in profile_models.json
+    models = Models()
+    with Profiler('models.py') as profiler:
+        models.save()
+    profiler.dump(os.path.join(directory_path, 'profile_models.json'))
+    # Reported by the script only, so that save() prints nothing (cli.py is quiet unless --verbose)
+    print(f"The area under IRF (IPCC1990) from 0 to infinity is {models.area_under_A_inf:.2f} ton-years.")
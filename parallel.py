@@ -0,0 +1,48 @@
+"""
+This module runs the sweeps of sweeps.py on several cores. The outer axis of the grid (time horizons or discount
+rates) is split into chunks, every chunk is computed by a worker of a ProcessPoolExecutor and the partial results
+are concatenated in chunk order, so the returned DataFrame has the same rows and columns as the serial sweep.
+This pays off for IRFs that still need numeric quadrature; the closed-form sweeps are faster serially.
+
+The grid function, the IRF and any extra arguments are sent to the workers, so they must be picklable (IRF
+objects and registry names are, a callable IRF has to be a module-level function). On Windows the caller must
+be protected by an if __name__ == '__main__' guard.
+"""
+
+# Import packages
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+
+
+def split_chunks(values, chunk_size):
+    """Split an array into consecutive chunks of at most chunk_size values."""
+    values = np.asarray(values)
+    return [values[start:start + chunk_size] for start in range(0, len(values), chunk_size)]
+
+
+def _run_chunk(grid_function, irf, inner, kwargs, outer_chunk):
+    return grid_function(irf, outer_chunk, inner, **kwargs)
+
+
+def parallel_grid(grid_function, irf, outer, inner, max_workers=None, chunk_size=None, **kwargs):
+    """
+    Evaluate grid_function(irf, outer, inner, **kwargs), e.g. sweeps.lashof_grid, with the outer axis split into
+    chunks of chunk_size values run in max_workers processes (default: one per core, about four chunks per
+    worker). max_workers=1 runs the chunks serially in this process.
+    """
+    max_workers = max_workers or os.cpu_count()
+    outer = np.asarray(outer)
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(outer) // (4 * max_workers)))
+    work = partial(_run_chunk, grid_function, irf, inner, kwargs)
+    chunks = split_chunks(outer, chunk_size)
+    if max_workers == 1:
+        results = list(map(work, chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # map returns the results in submission order, whatever order the chunks finish in
+            results = list(executor.map(work, chunks))
+    return pd.concat(results, ignore_index=True)
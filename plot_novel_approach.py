@@ -1,36 +1,31 @@
 # %% This script creates plots that are useful to analyze the results of the novel approach
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+import os
+from rendering import render_figures
+from results_store import read_results
 
 # Define the directory path
 directory_path = r'C:\thesis\python'
 
-# Load the CSV file into a DataFrame
-csv_file_path = f'{directory_path}\\new_approach.csv'
-new_approach = pd.read_csv(csv_file_path)
-new_approach = new_approach.drop(columns=['Avoided Emission', 'Costs of Release', 'Benefits'])
-
 # %% Define the delay times to plot
 delay_times = [10, 50, 100, 200]
 
-# Filter the DataFrame for the specified delay times
-filtered_df = new_approach[new_approach['Delay'].isin(delay_times)]
-
-# Create a single plot
-plt.figure()
-
-# Plot each delay time on the same axes
-for delay in delay_times:
-    subset = filtered_df[filtered_df['Delay'] == delay]
-    plt.plot(subset['Discount Rate'], subset['Equivalence ratio'], marker='o', linestyle='-', label=f'Delay {delay}')
-
-# Add titles and labels
-plt.title('Equivalence Ratio vs Discount Rate for Different Delay Times')
-plt.xlabel('Discount Rate')
-plt.ylabel('Equivalence Ratio')
-plt.legend()
-plt.grid(True)
-plt.savefig(f'{directory_path}\\EquivalenceRatioNewApproach.png')
-plt.show()
\ No newline at end of file
+
+# Equivalence ratio of the new approach against the discount rate, one line per delay time (see rendering.py)
+FIGURE = {'name': 'EquivalenceRatioNewApproach', 'data': 'new_approach', 'kind': 'line', 'group': 'Delay',
+          'groups': delay_times, 'label': 'Delay {}', 'x': 'Discount Rate', 'y': 'Equivalence ratio',
+          'style': {'marker': 'o', 'linestyle': '-'},
+          'title': 'Equivalence Ratio vs Discount Rate for Different Delay Times', 'ylabel': 'Equivalence Ratio'}
+
+
+def plot(directory=directory_path, delay_times=delay_times):
+    """Equivalence ratio of the new approach against the discount rate, one line per delay time."""
+    # Load only the needed columns and the rows of the specified delay times from the columnar store written by
+    # models.py (see results_store.py)
+    filtered_df = read_results(os.path.join(directory, 'new_approach'),
+                               columns=['Discount Rate', 'Delay', 'Equivalence ratio'], filters={'Delay': delay_times})
+    return render_figures([{**FIGURE, 'groups': delay_times}], {'new_approach': filtered_df}, directory, 1)
+
+
+if __name__ == '__main__':
+    plot()
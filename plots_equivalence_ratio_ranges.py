@@ -1,32 +1,38 @@
 # %% This script creates plots that are useful to analyze the equivalence ratio
 
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
+from adaptive import adaptive_sweep
+from contours import contour
+from rendering import render_figures
 # Define the directory path
 directory_path = r'C:\thesis\python'
 
-# Load the CSV file into a DataFrame
-csv_file_path = f'{directory_path}\lashof_joos.csv'
-lashof_joos = pd.read_csv(csv_file_path)
-
 # parameters
 lower_bound = 99
 upper_bound = 101
 
-# Filter the dataframe based on the equivalence ratio
-filtered_data = lashof_joos[(lashof_joos['Equivalence Ratio'] >= lower_bound) & (lashof_joos['Equivalence Ratio'] <= upper_bound)]
 
-# Create the plot
-plt.figure(figsize=(10, 6))
-plt.scatter(filtered_data['Time Horizon (years)'], filtered_data['Delay (years)'], c=filtered_data['Equivalence Ratio'], cmap='viridis', edgecolor='k')
-plt.colorbar(label='Equivalence Ratio')
-plt.xlabel('Time Horizon (years)')
-plt.ylabel('Delay (years)')
-plt.title(f'Time Horizon and Delay for Equivalence Ratio between {lower_bound} and {upper_bound}')
-plt.grid(True)
-plt.savefig(f'{directory_path}\\EquivalenceRatio.png')
-plt.show()
+def plot(directory=directory_path, lower_bound=lower_bound, upper_bound=upper_bound):
+    """Scatter of the (time horizon, delay) pairs with an equivalence ratio in [lower_bound, upper_bound]."""
+    # Refine the Lashof grid of Joos et al. (2013) only around the equivalence ratio range, down to 1 year in time
+    # horizon and delay (see adaptive.py), instead of computing the whole dense grid and filtering it
+    lashof_joos = adaptive_sweep('lashof', 'joos2013', (50, 10050), (10, 200), (lower_bound, upper_bound), 1, 1)
+    filtered_data = lashof_joos[lashof_joos['Equivalence Ratio'].between(lower_bound, upper_bound)]
+
+    # Edges of the range: the time horizon at which the ratio equals each bound, solved for every delay (see
+    # contours.py) within the scanned time horizons; delays whose edge lies beyond them are dropped
+    datasets = {'equivalence_ratio': filtered_data}
+    for name, bound in (('lower_contour', lower_bound), ('upper_contour', upper_bound)):
+        datasets[name] = contour('lashof', 'joos2013', bound, np.arange(10, 201), max_time_horizon=10050).dropna()
+
+    # Render the plot (see rendering.py); the refined band has about 10^4 points, drawn small and without edges so
+    # that the colors stay visible
+    figure = {'name': 'EquivalenceRatio', 'data': 'equivalence_ratio', 'kind': 'scatter', 'x': 'Time Horizon (years)',
+              'y': 'Delay (years)', 'color': 'Equivalence Ratio', 'cmap': 'viridis', 'style': {'s': 4, 'linewidths': 0},
+              'overlays': ['lower_contour', 'upper_contour'], 'figsize': (10, 6),
+              'title': f'Time Horizon and Delay for Equivalence Ratio between {lower_bound} and {upper_bound}'}
+    return render_figures([figure], datasets, directory, 1)
+
 
 # %%
 # # Create the hexbin plot
@@ -40,3 +46,6 @@ plt.show()
 # plt.savefig(f'{directory_path}\\EquivalenceRatioHexbinPlot.png')
 # plt.show()
 
+
+if __name__ == '__main__':
+    plot()
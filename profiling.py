@@ -0,0 +1,162 @@
+"""
+This module instruments long runs. While a Profiler is active (with Profiler('models') as profiler: ...), the
+hooks placed in the sweeps, the sweep cache, the stores and the scripts record:
+- stage timers: the wall time, number of entries and peak traced memory (tracemalloc, which also sees NumPy
+  arrays) of every named stage, e.g. 'save_lashof_joos/integration', 'save_lashof_joos/dataframe' and
+  'save_lashof_joos/csv'; nested stages are named by their path
+- call counters: calls and evaluated points of the IRFs (by registry name, e.g. 'joos2013' for UD,
+  'joos2013.discounted' for DD and 'ipcc1990' for A), closed-form areas and solver iterations
+- a live progress line with an ETA on stderr for loops wrapped in progress()
+
+dump() writes the profile as JSON, to size batch jobs and to compare runs. Without an active profiler the
+hooks do nothing but check a global.
+"""
+
+# Import packages
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import numpy as np
+
+# The profiler the hooks report to, or None
+_active = None
+
+
+class Profiler:
+    """Named stage timers, call counters and peak memory of a run; memory=False skips tracemalloc."""
+
+    def __init__(self, name, memory=True, show_progress=True, progress_interval=0.5):
+        self.name = name
+        self.memory = memory
+        self.show_progress = show_progress
+        self.progress_interval = progress_interval
+        self.stages = {}
+        self.counters = {}
+        self.peak_bytes = 0
+        self._open = []
+        # Label of the progress line last written to stderr, while it has no line break
+        self.progress_line = None
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._stop_tracing = True
+        else:
+            self._stop_tracing = False
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        self._sample_memory()
+        self.wall_time = time.perf_counter() - self._start
+        if self._stop_tracing:
+            tracemalloc.stop()
+        _active = self._previous
+
+    def _sample_memory(self):
+        """Fold the traced peak since the last sample into the open stages and the run, and reset it."""
+        if not (self.memory and tracemalloc.is_tracing()):
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        self.peak_bytes = max(self.peak_bytes, peak)
+        for entry in self._open:
+            entry[2] = max(entry[2], peak)
+
+    @contextmanager
+    def stage(self, name):
+        path = '/'.join([entry[0] for entry in self._open] + [name])
+        self._sample_memory()
+        entry = [name, time.perf_counter(), 0]
+        self._open.append(entry)
+        try:
+            yield
+        finally:
+            self._sample_memory()
+            self._open.pop()
+            stage = self.stages.setdefault(path, {'calls': 0, 'seconds': 0.0, 'peak_bytes': 0})
+            stage['calls'] += 1
+            stage['seconds'] += time.perf_counter() - entry[1]
+            stage['peak_bytes'] = max(stage['peak_bytes'], entry[2])
+
+    def count(self, name, values=1):
+        counter = self.counters.setdefault(name, {'calls': 0, 'values': 0})
+        counter['calls'] += 1
+        counter['values'] += int(values)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started': self.started,
+            'wall_time': getattr(self, 'wall_time', time.perf_counter() - self._start),
+            'peak_bytes': self.peak_bytes if self.memory else None,
+            'stages': self.stages,
+            'counters': self.counters,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform()
+        }
+
+    def dump(self, path):
+        """Write the profile as JSON to path."""
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+
+# %% Hooks: no-ops unless a Profiler is active
+def stage(name):
+    """Context manager timing a named stage of the active profiler."""
+    return nullcontext() if _active is None else _active.stage(name)
+
+
+def count(name, values=1):
+    """Count a call (and the number of values it evaluated) on the active profiler."""
+    if _active is not None:
+        _active.count(name, values)
+
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}'
+
+
+def progress(iterable, label, total=None):
+    """
+    Yield from iterable, showing '{label} done/total (percent) elapsed, ETA' on stderr while a profiler with
+    show_progress is active; the line is updated at most every progress_interval seconds.
+    """
+    if _active is None or not _active.show_progress:
+        yield from iterable
+        return
+    total = len(iterable) if total is None else total
+    interval = _active.progress_interval
+    start = last = time.perf_counter()
+    done = 0
+    for item in iterable:
+        yield item
+        done += 1
+        now = time.perf_counter()
+        if now - last >= interval or done == total:
+            last = now
+            elapsed = now - start
+            eta = elapsed / done * (total - done)
+            # A nested loop starts a new line below the line of the enclosing one
+            if _active.progress_line not in (None, label):
+                sys.stderr.write('\n')
+            sys.stderr.write(f'\r{label} {done}/{total} ({100 * done / total:.0f}%) {_format_seconds(elapsed)} '
+                             f'elapsed, ETA {_format_seconds(eta)}')
+            sys.stderr.flush()
+            _active.progress_line = label
+    if _active.progress_line == label:
+        sys.stderr.write('\n')
+        _active.progress_line = None
@@ -0,0 +1,66 @@
+"""
+This module integrates arbitrary integrands over [0, inf) against the discount factor of the new approach,
+area(r, shift) = integral of f(t) * exp(-r * (t + shift)) dt, on precomputed nodes instead of adaptive quad.
+All discount rates and shifts (delays) of a grid are evaluated together as one matrix product, and it works for
+any callable f that accepts arrays; IRFs written as sums of exponentials have exact closed forms instead (see
+analytic_integration.py).
+
+Two rules are available:
+- 'exp_sinh' (default): the nodes t_k = exp(pi / 2 * sinh(k * step)) cluster double-exponentially at 0 and
+  reach 1e12 years, so decays from days to millions of years are resolved by the same nodes (about 230 nodes
+  with the default step; the Joos et al. (2013) and IPCC (1990) areas agree with the closed forms to 1e-12).
+  The integrand is evaluated once on the nodes and the rates only enter through the matrix exp(-r * t_k).
+- 'laguerre': Gauss-Laguerre nodes scaled to every discount rate, t_i = x_i / r. This is exact for integrands
+  that are polynomials of degree below 2n and converges quickly for integrands that vary on the time scale
+  1 / r, but it cannot resolve decays much faster than 1 / r and needs r > 0. The integrand is evaluated on a
+  (rates x nodes) array.
+"""
+
+# Import packages
+from functools import lru_cache
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def exp_sinh(step=1 / 32, t_min=1e-12, t_max=1e12):
+    """Nodes and weights of the exp-sinh rule over [0, inf), truncated to the nodes within [t_min, t_max]."""
+    # Levels k * step at which the nodes reach t_min and t_max
+    low, high = (np.arcsinh(2 / np.pi * np.log(t)) for t in (t_min, t_max))
+    levels = np.arange(np.floor(low / step), np.ceil(high / step) + 1) * step
+    nodes = np.exp(np.pi / 2 * np.sinh(levels))
+    weights = step * np.pi / 2 * np.cosh(levels) * nodes
+    return nodes, weights
+
+
+@lru_cache(maxsize=None)
+def gauss_laguerre(n=64):
+    """Nodes and weights of Gauss-Laguerre quadrature with n nodes, for integrals of f(x) * exp(-x) over [0, inf)."""
+    return np.polynomial.laguerre.laggauss(n)
+
+
+def laplace_areas(integrand, rates, shift=0.0, rule='exp_sinh', **rule_options):
+    """
+    Areas under integrand(t) * exp(-r * (t + shift)) over [0, inf), for arrays of rates and shifts (broadcast
+    against each other). rule is 'exp_sinh' (options: step, t_min, t_max) or 'laguerre' (option: n); the
+    integrand must accept arrays of times. With 'exp_sinh', areas whose discounted integrand has not decayed at
+    the last node are inf: they diverge (e.g. an IRF with a constant term at r = 0) or need a larger t_max.
+    """
+    rates, shift = np.broadcast_arrays(np.asarray(rates, dtype=float), np.asarray(shift, dtype=float))
+    unique_rates, inverse = np.unique(rates, return_inverse=True)
+    if rule == 'exp_sinh':
+        nodes, weights = exp_sinh(**rule_options)
+        values = integrand(nodes)
+        with np.errstate(over='ignore', invalid='ignore'):
+            discount = np.exp(-np.multiply.outer(unique_rates, nodes))
+            areas = discount @ (weights * values)
+            # Tail beyond the last node, about t * f(t) * exp(-r * t) there, against the area
+            tail = np.abs(nodes[-1] * values[-1] * discount[:, -1])
+            areas = np.where(~(tail <= 1e-9 * np.abs(areas)), np.inf, areas)
+    elif rule == 'laguerre':
+        if np.any(unique_rates <= 0):
+            raise ValueError('Gauss-Laguerre quadrature needs positive discount rates')
+        nodes, weights = gauss_laguerre(**rule_options)
+        areas = integrand(np.divide.outer(nodes, unique_rates).T) @ weights / unique_rates
+    else:
+        raise ValueError(f'Unknown quadrature rule {rule!r}')
+    return areas[inverse.ravel()].reshape(rates.shape) * np.exp(-rates * shift)
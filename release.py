@@ -0,0 +1,164 @@
+"""
+This module replaces the single re-emission pulse at the delay with a release schedule: the stored carbon is
+re-emitted along a curve, e.g. the decay of biochar or timber. A schedule is a set of masses (fractions of
+the stored carbon) released at the nodes 0, step, 2 * step, ... of a time lattice, either tabulated or built
+from a parametric release curve (see SCHEDULES):
+- 'pulse': everything at delay, as in models.py (a delay between two nodes is split linearly between them)
+- 'exponential': first-order decay with half_life
+- 'linear': constant release over duration
+- 'weibull': Weibull release curve with scale and shape
+All parametric schedules may start releasing at start (default 0). The mass a curve releases during a step is
+split equally between the two nodes of the step (trapezoidal rule); mass released after the last node is not
+counted.
+
+The atmospheric burden of the released carbon is the convolution of the schedule with the IRF, and its area up
+to the time horizon is the convolution with the prefix areas F of the IRF: sum_i m_i * F(TH - t_i), which is
+F(TH - delay) for a pulse. Both are computed for all horizons of the lattice at once with FFTs along the last
+axis, so a batch of schedules (leading axes, e.g. one per half-life) over 10,000 years costs a few FFTs.
+The prefix areas are exact for closed-form IRFs and tabulated with quad otherwise (see analytic_integration.py).
+
+For the new approach the discounted costs of release are the avoided emission times sum_i m_i * exp(-r * t_i),
+which is exp(-r * delay) for a pulse.
+"""
+
+# Import packages
+import numpy as np
+import pandas as pd
+from analytic_integration import cumulative_area_table, integrate
+from irf import get_irf
+from profiling import stage
+
+
+# Cumulative fraction released after a time t >= 0 from the start of the release, by schedule
+SCHEDULES = {
+    'exponential': lambda t, half_life: -np.expm1(-np.log(2) * t / half_life),
+    'linear': lambda t, duration: np.clip(t / duration, 0, 1),
+    'weibull': lambda t, scale, shape: -np.expm1(-(t / scale) ** shape)
+}
+
+# Column names of the schedule parameters in the result tables
+PARAMETER_COLUMNS = {
+    'delay': 'Delay (years)',
+    'half_life': 'Half-life (years)',
+    'duration': 'Duration (years)',
+    'scale': 'Scale (years)',
+    'shape': 'Shape',
+    'start': 'Start (years)'
+}
+
+
+def release_masses(kind, n_steps, step=1, start=0, **parameters):
+    """
+    Masses released at the nodes 0, step, ..., n_steps * step by a 'pulse' (with delay) or a schedule of
+    SCHEDULES (with its parameters). Parameters and start are broadcast against each other; the result has
+    their broadcast shape plus a trailing axis of n_steps + 1 nodes.
+    """
+    nodes = np.arange(n_steps + 1) * step
+    start = np.asarray(start, dtype=float)[..., np.newaxis]
+    if kind == 'pulse':
+        position = (start + np.asarray(parameters['delay'], dtype=float)[..., np.newaxis]) / step
+        # Linear split between the two nearest nodes, a single node when the delay is on the lattice
+        return np.clip(1 - np.abs(np.arange(n_steps + 1) - position), 0, None)
+    parameters = {name: np.asarray(value, dtype=float)[..., np.newaxis] for name, value in parameters.items()}
+    released = SCHEDULES[kind](np.clip(nodes - start, 0, None), **parameters)
+    per_step = np.diff(released, axis=-1)
+    masses = np.zeros(per_step.shape[:-1] + (n_steps + 1,))
+    masses[..., :-1] += per_step / 2
+    masses[..., 1:] += per_step / 2
+    return masses
+
+
+def convolve(masses, table, max_values=2 * 10 ** 7):
+    """
+    out[..., k] = sum_{i <= k} masses[..., i] * table[k - i] for every node k, with FFTs along the last axis.
+    The schedules are transformed in batches of at most about max_values spectrum values.
+    """
+    n = masses.shape[-1]
+    size = 1 << (2 * n - 1).bit_length()
+    table_spectrum = np.fft.rfft(table[:n], size)
+    rows = masses.reshape(-1, n)
+    batch = max(1, max_values // size)
+    out = np.empty(rows.shape)
+    for start in range(0, len(rows), batch):
+        spectrum = np.fft.rfft(rows[start:start + batch], size, axis=-1) * table_spectrum
+        out[start:start + batch] = np.fft.irfft(spectrum, size, axis=-1)[:, :n]
+    return out.reshape(masses.shape)
+
+
+def burden(irf, masses, step=1):
+    """Atmospheric burden of the released carbon at every node of the schedules."""
+    irf = get_irf(irf)
+    with stage('convolution'):
+        return convolve(masses, irf(np.arange(masses.shape[-1]) * step))
+
+
+def burden_area(irf, masses, step=1):
+    """Area under the atmospheric burden of the released carbon from 0 to every node of the schedules."""
+    with stage('integration'):
+        table = cumulative_area_table(get_irf(irf), (masses.shape[-1] - 1) * step, step)
+    with stage('convolution'):
+        return convolve(masses, table)
+
+
+def lashof_release(irf, masses, time_horizons, step=1):
+    """
+    Costs, benefits and equivalence ratio of the Lashof method with the release schedules masses, at time
+    horizons on the lattice (multiples of step, at most the last node; others raise ValueError). Costs are F(TH)
+    as in models.py and benefits F(TH) minus the area under the burden of the released carbon up to TH, so a
+    time horizon before any release has a ratio of 1 (models.py leaves a pulse after the time horizon NaN). The
+    outputs have the leading shape of masses plus a trailing axis of time horizons.
+    """
+    time_horizons = np.asarray(time_horizons, dtype=float)
+    positions = time_horizons / step
+    nodes = np.rint(positions).astype(int)
+    for time_horizon, position, node in zip(time_horizons.ravel(), positions.ravel(), nodes.ravel()):
+        if not np.isclose(position, node, rtol=0, atol=1e-9):
+            raise ValueError(f'Time horizon {time_horizon:g} is not a multiple of the step {step:g}')
+        if not 0 <= node < masses.shape[-1]:
+            raise ValueError(f'Time horizon {time_horizon:g} is outside the schedule, which ends at '
+                             f'{(masses.shape[-1] - 1) * step:g}')
+    with stage('integration'):
+        table = cumulative_area_table(get_irf(irf), (masses.shape[-1] - 1) * step, step)
+    with stage('convolution'):
+        released = convolve(masses, table)[..., nodes]
+    costs = np.broadcast_to(table[nodes], released.shape)
+    benefits = costs - released
+    return costs, benefits, costs / benefits
+
+
+def new_approach_release(irf, masses, rates, step=1):
+    """
+    Avoided emission, costs of release, benefits and equivalence ratio of the new approach with the release
+    schedules masses, for the discount rates rates. The outputs have the leading shape of masses plus a trailing
+    axis of rates.
+    """
+    irf = get_irf(irf)
+    rates = np.asarray(rates, dtype=float)
+    avoided_emission = np.array([integrate(irf, 0, np.inf, rate) for rate in rates.ravel()]).reshape(rates.shape)
+    # Discount factor of every node, contracted with the masses
+    discount = np.exp(-np.multiply.outer(np.arange(masses.shape[-1]) * step, rates))
+    costs_of_release = avoided_emission * (masses @ discount)
+    benefits = avoided_emission - costs_of_release
+    return np.broadcast_to(avoided_emission, benefits.shape), costs_of_release, benefits, avoided_emission / benefits
+
+
+def lashof_release_grid(irf, kind, time_horizons, step=1, **parameters):
+    """
+    Lashof results for every (time horizon, schedule) pair, with the columns of lashof_JOOS.csv and one column
+    per schedule parameter (see PARAMETER_COLUMNS), e.g. lashof_release_grid('joos2013', 'exponential',
+    range(50, 10050, 50), half_life=[10, 100, 1000]). Schedules are given as in release_masses; the rows follow
+    the time horizons, then the schedules.
+    """
+    time_horizons = np.asarray(time_horizons)
+    start = parameters.pop('start', 0)
+    values = np.broadcast_arrays(*(np.asarray(value) for value in (start, *parameters.values())))
+    masses = release_masses(kind, int(np.rint(time_horizons.max() / step)), step, values[0],
+                            **dict(zip(parameters, values[1:])))
+    costs, benefits, ratio = (np.moveaxis(x.reshape(-1, len(time_horizons)), -1, 0).ravel()
+                              for x in lashof_release(irf, masses, time_horizons, step))
+    columns = {'Time Horizon (years)': np.repeat(time_horizons, values[0].size)}
+    for name, value in zip(['start', *parameters], values):
+        if name != 'start' or np.any(value):
+            columns[PARAMETER_COLUMNS.get(name, name)] = np.tile(value.ravel(), len(time_horizons))
+    columns.update({'Costs (ton-years)': costs, 'Benefits (ton-years)': benefits, 'Equivalence Ratio': ratio})
+    return pd.DataFrame(columns)
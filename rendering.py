@@ -0,0 +1,163 @@
+"""
+This module renders the report figures without a display. A figure is described by a spec, a dict such as
+
+    {'name': 'TH_r_delay2', 'data': 'best_discount_rates', 'kind': 'grid', 'facet': 'Delay (years)',
+     'facets': [10, 30, 70, 100, 150, 200], 'x': 'Best Discount Rate', 'y': 'Time Horizon (years)',
+     'title': 'Delay: {}', 'xlabel': 'Discount Rate', 'ylabel': 'Time Horizon (years)', 'ylim': (0, 1000)}
+
+and render_figures draws a list of specs from a dict of named DataFrames. Every dataset is grouped once per
+column the specs select on (facet, group, hue or where), and each spec receives only its subsets, with only
+the columns it plots. The figures are drawn on Agg canvases (matplotlib.figure.Figure, no pyplot state and no
+windows) in worker processes of a ProcessPoolExecutor and saved as {name}.{format} in directory.
+
+Kinds of figures:
+- 'line': y against x, one line per value of 'group' (labelled with 'label', e.g. 'Delay {}') if given
+- 'scatter': y against x, colored by a discrete 'hue' column (one legend entry per value) or a continuous
+  'color' column (with a colorbar labelled 'colorbar'); 'overlays' names datasets drawn as black lines
+- 'grid': one scatter subplot per value in 'facets' of the 'facet' column, 'columns' subplots per row;
+  'ylims' gives one y-range per subplot
+Common keys: 'where' (a (column, value) pair selecting rows), 'figsize', 'title', 'xlabel', 'ylabel', 'xlim',
+'ylim', 'xtick_step', 'legend', 'legend_title', 'format' (default 'png') and 'savefig' (keyword arguments of
+savefig, e.g. {'bbox_inches': 'tight'}).
+"""
+
+# Import packages
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+from matplotlib.ticker import MultipleLocator
+from profiling import stage
+
+
+def panel_column(spec):
+    """Column whose values split the figure into subplots, lines or colored series, or None."""
+    return spec.get('facet') or spec.get('group') or spec.get('hue')
+
+
+def plotted_columns(spec):
+    return [column for column in (spec.get('x'), spec.get('y'), spec.get('color')) if column]
+
+
+class GroupedData:
+    """The datasets of a rendering run, each grouped at most once per column."""
+
+    def __init__(self, datasets):
+        self.datasets = datasets
+        self.groups = {}
+
+    def grouped(self, name, column):
+        if (name, column) not in self.groups:
+            self.groups[name, column] = dict(tuple(self.datasets[name].groupby(column, sort=True)))
+        return self.groups[name, column]
+
+    def subset(self, name, column, value):
+        frame = self.grouped(name, column).get(value)
+        return self.datasets[name].iloc[:0] if frame is None else frame
+
+    def panels(self, spec):
+        """(value, frame) pairs of a spec: one per facet, group or hue value, or a single (None, frame)."""
+        name = spec['data']
+        if 'where' in spec:
+            frame = self.subset(name, *spec['where'])
+        else:
+            frame = self.datasets[name]
+        column = panel_column(spec)
+        if column is None:
+            return [(None, frame[plotted_columns(spec)])]
+        if 'where' in spec:
+            groups = dict(tuple(frame.groupby(column, sort=True)))
+        else:
+            groups = self.grouped(name, column)
+        values = spec.get('facets') or spec.get('groups') or list(groups)
+        empty = frame.iloc[:0]
+        return [(value, groups.get(value, empty)[plotted_columns(spec)]) for value in values]
+
+    def overlays(self, spec):
+        return [self.datasets[name][[spec['x'], spec['y']]] for name in spec.get('overlays', [])]
+
+
+def _decorate(ax, spec, title=None, ylim=None):
+    ax.set_title(spec.get('title', '') if title is None else title)
+    ax.set_xlabel(spec.get('xlabel', spec.get('x', '')))
+    ax.set_ylabel(spec.get('ylabel', spec.get('y', '')))
+    if 'xlim' in spec:
+        ax.set_xlim(*spec['xlim'])
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+    if 'xtick_step' in spec:
+        ax.xaxis.set_major_locator(MultipleLocator(spec['xtick_step']))
+    ax.grid(spec.get('grid', True))
+
+
+def draw(spec, panels, overlays=()):
+    """Figure of a spec from its panels (see GroupedData.panels) and overlay frames."""
+    kind = spec['kind']
+    x, y = spec['x'], spec['y']
+    if kind == 'grid':
+        columns = spec.get('columns', 3)
+        rows = (len(panels) + columns - 1) // columns
+        figure = Figure(figsize=spec.get('figsize', (15, 5 * rows)))
+        axes = figure.subplots(rows, columns, squeeze=False).ravel()
+        ylims = spec.get('ylims') or [spec.get('ylim')] * len(panels)
+        for ax, (value, frame), ylim in zip(axes, panels, ylims):
+            ax.scatter(frame[x], frame[y])
+            _decorate(ax, spec, spec.get('title', '{}').format(value), ylim)
+        # Remove any unused subplots
+        for ax in axes[len(panels):]:
+            figure.delaxes(ax)
+        figure.tight_layout()
+        return figure
+
+    figure = Figure(figsize=spec.get('figsize', (6.4, 4.8)))
+    ax = figure.subplots()
+    style = spec.get('style', {})
+    if kind == 'line':
+        for value, frame in panels:
+            label = spec['label'].format(value) if 'label' in spec else None
+            ax.plot(frame[x], frame[y], label=label, **style)
+    elif kind == 'scatter' and 'hue' in spec:
+        colors = colormaps[spec.get('cmap', 'viridis')](np.linspace(0, 1, max(len(panels), 1)))
+        for color, (value, frame) in zip(colors, panels):
+            ax.scatter(frame[x], frame[y], color=color, label=f'{value}', **style)
+    elif kind == 'scatter':
+        (value, frame), = panels
+        if 'color' in spec:
+            points = ax.scatter(frame[x], frame[y], c=frame[spec['color']], cmap=spec.get('cmap', 'viridis'),
+                                **style)
+            figure.colorbar(points, ax=ax, label=spec.get('colorbar', spec['color']))
+        else:
+            ax.scatter(frame[x], frame[y], **style)
+    else:
+        raise ValueError(f'Unknown figure kind {kind!r}')
+    for frame in overlays:
+        ax.plot(frame[x], frame[y], color='k', linewidth=1)
+    _decorate(ax, spec, ylim=spec.get('ylim'))
+    if spec.get('legend', 'hue' in spec or 'label' in spec):
+        ax.legend(title=spec.get('legend_title'))
+    return figure
+
+
+def render_figure(spec, panels, overlays, directory):
+    """Draw a spec and save it in directory; returns the path of the file."""
+    path = os.path.join(directory, f"{spec['name']}.{spec.get('format', 'png')}")
+    draw(spec, panels, overlays).savefig(path, **spec.get('savefig', {}))
+    return path
+
+
+def render_figures(specs, datasets, directory, max_workers=None):
+    """
+    Render the figure specs from the named DataFrames in datasets into directory, in max_workers processes
+    (default: one per core, at most one per figure; 1 renders in this process). Returns the saved paths.
+    """
+    with stage('grouping'):
+        data = GroupedData(datasets)
+        jobs = [(spec, data.panels(spec), data.overlays(spec)) for spec in specs]
+    max_workers = min(max_workers or os.cpu_count(), len(jobs)) or 1
+    with stage('rendering'):
+        if max_workers == 1:
+            return [render_figure(*job, directory) for job in jobs]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(render_figure, *job, directory) for job in jobs]
+            return [future.result() for future in futures]
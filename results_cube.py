@@ -0,0 +1,95 @@
+"""
+This module assembles the time horizon sweeps of several IRFs and methods into one labeled array with the
+dimensions (irf, method, metric, time horizon, delay). Time horizons and delays become sorted integer-indexed
+coordinates, so comparing methods or IRFs is plain indexing instead of chained outer merges on float keys, and
+selecting a single IRF, method or metric returns a view of the array without copying.
+"""
+
+# Import packages
+import numpy as np
+import pandas as pd
+
+# Metrics of the time horizon sweeps (see sweeps.py)
+METRICS = ['Costs (ton-years)', 'Benefits (ton-years)', 'Equivalence Ratio']
+TIME_HORIZON = 'Time Horizon (years)'
+DELAY = 'Delay (years)'
+
+
+def default_column_name(irf, method, metric):
+    return f'{metric}_{method}_{irf}'
+
+
+class ResultsCube:
+    """values[irf, method, metric, time_horizon, delay], NaN where a combination has no result."""
+
+    dims = ('irf', 'method', 'metric', 'time_horizon', 'delay')
+
+    def __init__(self, values, coords, present):
+        self.values = values
+        self.coords = coords
+        # (time horizon, delay) pairs that appear in at least one of the source frames
+        self.present = present
+
+    @classmethod
+    def from_frames(cls, frames, metrics=METRICS):
+        """Build a cube from {(irf, method): frame}, each frame with the columns of lashof_JOOS.csv."""
+        irfs = list(dict.fromkeys(irf for irf, method in frames))
+        methods = list(dict.fromkeys(method for irf, method in frames))
+        time_horizons = np.unique(np.concatenate([frame[TIME_HORIZON].to_numpy() for frame in frames.values()]))
+        delays = np.unique(np.concatenate([frame[DELAY].to_numpy() for frame in frames.values()]))
+        values = np.full((len(irfs), len(methods), len(metrics), len(time_horizons), len(delays)), np.nan)
+        present = np.zeros((len(time_horizons), len(delays)), dtype=bool)
+        for (irf, method), frame in frames.items():
+            rows = np.searchsorted(time_horizons, frame[TIME_HORIZON].to_numpy())
+            columns = np.searchsorted(delays, frame[DELAY].to_numpy())
+            values[irfs.index(irf), methods.index(method)][:, rows, columns] = frame[metrics].to_numpy().T
+            present[rows, columns] = True
+        coords = {'irf': irfs, 'method': methods, 'metric': list(metrics), 'time_horizon': time_horizons,
+                  'delay': delays}
+        return cls(values, coords, present)
+
+    def positions(self, dim, labels):
+        """Integer positions of labels along a dimension; raises KeyError for labels that are not coordinates."""
+        coords = self.coords[dim]
+        if isinstance(coords, list):
+            return np.array([coords.index(label) for label in np.atleast_1d(labels)]).reshape(np.shape(labels))
+        positions = np.clip(np.searchsorted(coords, labels), 0, len(coords) - 1)
+        if not np.all(coords[positions] == labels):
+            raise KeyError(f'{labels!r} not in the {dim} coordinates')
+        return positions
+
+    def sel(self, **selection):
+        """
+        Select by labels, e.g. sel(irf='JOOS', metric='Equivalence Ratio', delay=[10, 50]). A single label drops
+        its dimension (a view of the cube), a list of labels keeps it.
+        """
+        values = self.values
+        # Take the list selections first, while the axis numbers are still those of self.dims
+        for axis, dim in enumerate(self.dims):
+            if dim in selection and np.ndim(selection[dim]) > 0:
+                values = np.take(values, self.positions(dim, selection[dim]), axis=axis)
+        index = tuple(int(self.positions(dim, selection[dim])) if dim in selection and np.ndim(selection[dim]) == 0
+                      else slice(None) for dim in self.dims)
+        return values[index]
+
+    def to_frame(self, time_horizons=None, delays=None, column_name=None):
+        """
+        Wide frame with one row per (time horizon, delay) present in the sources, sorted by time horizon and
+        delay, and one column per (irf, method, metric), named column_name(irf, method, metric). The rows can be
+        restricted to lists of time horizons and delays; labels that are not coordinates are ignored.
+        """
+        column_name = column_name or default_column_name
+        rows = np.arange(len(self.coords['time_horizon'])) if time_horizons is None else \
+            np.flatnonzero(np.isin(self.coords['time_horizon'], time_horizons))
+        columns = np.arange(len(self.coords['delay'])) if delays is None else \
+            np.flatnonzero(np.isin(self.coords['delay'], delays))
+        present = self.present[np.ix_(rows, columns)]
+        row_index, column_index = np.nonzero(present)
+        frame = {TIME_HORIZON: self.coords['time_horizon'][rows[row_index]],
+                 DELAY: self.coords['delay'][columns[column_index]]}
+        block = self.values[..., rows[:, None], columns][..., row_index, column_index]
+        for i, irf in enumerate(self.coords['irf']):
+            for j, method in enumerate(self.coords['method']):
+                for k, metric in enumerate(self.coords['metric']):
+                    frame[column_name(irf, method, metric)] = block[i, j, k]
+        return pd.DataFrame(frame)
@@ -0,0 +1,106 @@
+"""
+This module stores sweep results in a typed columnar format: a directory with one .npy file per column and a
+manifest.json describing the columns and the sort order of the rows. Readers memory-map the files and load
+only the requested columns; filters on the leading sort keys are resolved with searchsorted into row ranges,
+so only those rows are read from disk, and the remaining filters are applied to the selected rows only.
+
+Filters are given as {column: condition}, where the condition is a single value (equality), a list/array of
+values (membership) or a (low, high) tuple (inclusive range).
+"""
+
+# Import packages
+import json
+import os
+import numpy as np
+import pandas as pd
+from profiling import stage
+
+MANIFEST = 'manifest.json'
+
+
+def write_results(frame, path, sort_by, **extra):
+    """
+    Write a results frame as a columnar store at path (a directory), with rows sorted by the sort_by columns.
+    Extra keyword arguments are stored in the manifest (e.g. identity, see incremental.py).
+    """
+    with stage('store'):
+        frame = frame.sort_values(list(sort_by), kind='stable', ignore_index=True)
+        os.makedirs(path, exist_ok=True)
+        files = []
+        for i, column in enumerate(frame.columns):
+            file_name = f'column_{i}.npy'
+            np.save(os.path.join(path, file_name), frame[column].to_numpy())
+            files.append(file_name)
+        # The manifest is written last, so a store is only readable once all its columns are complete
+        write_manifest(path, list(frame.columns), files, sort_by, len(frame), **extra)
+
+
+def write_manifest(path, columns, files, sort_by, rows, **extra):
+    """Write the manifest of a store whose column files are complete; extra entries are stored alongside."""
+    manifest = {'columns': list(columns), 'files': list(files), 'sort_by': list(sort_by), 'rows': int(rows), **extra}
+    temporary_path = os.path.join(path, f'{MANIFEST}.tmp')
+    with open(temporary_path, 'w') as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(temporary_path, os.path.join(path, MANIFEST))
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as file:
+        return json.load(file)
+
+
+def _is_range(condition):
+    return isinstance(condition, tuple)
+
+
+def _refine_ranges(ranges, column, condition):
+    """Narrow row ranges that are sorted on column down to the rows satisfying condition."""
+    refined = []
+    for start, stop in ranges:
+        block = column[start:stop]
+        if _is_range(condition):
+            low, high = condition
+            bounds = [(np.searchsorted(block, low, side='left'), np.searchsorted(block, high, side='right'))]
+        else:
+            values = np.unique(np.atleast_1d(condition))
+            bounds = zip(np.searchsorted(block, values, side='left'), np.searchsorted(block, values, side='right'))
+        refined.extend((start + low, start + high) for low, high in bounds if high > low)
+    return refined
+
+
+def _matches(values, condition):
+    if _is_range(condition):
+        return (values >= condition[0]) & (values <= condition[1])
+    return np.isin(values, np.atleast_1d(condition))
+
+
+def read_results(path, columns=None, filters=None):
+    """Read the requested columns (default: all) of the rows of a columnar store that satisfy the filters."""
+    manifest = read_manifest(path)
+    files = dict(zip(manifest['columns'], manifest['files']))
+    columns = list(manifest['columns'] if columns is None else columns)
+    filters = dict(filters or {})
+
+    def load(column):
+        return np.load(os.path.join(path, files[column]), mmap_mode='r')
+
+    # Push the filters on the leading sort keys down to row ranges; the rows stay sorted on the next key only
+    # while the previous keys are fixed to single values
+    ranges = [(0, manifest['rows'])]
+    for key in manifest['sort_by']:
+        if key not in filters:
+            break
+        condition = filters.pop(key)
+        ranges = _refine_ranges(ranges, load(key), condition)
+        if _is_range(condition):
+            break
+
+    def take(column):
+        data = load(column)
+        return np.concatenate([data[start:stop] for start, stop in ranges]) if ranges else data[:0].copy()
+
+    # Apply the remaining filters to the selected rows only
+    mask = np.ones(sum(stop - start for start, stop in ranges), dtype=bool)
+    for column, condition in filters.items():
+        mask &= _matches(take(column), condition)
+    return pd.DataFrame({column: take(column)[mask] for column in columns})
@@ -0,0 +1,101 @@
+"""
+This module computes the derivatives of the equivalence ratios with respect to the time horizon, the delay and
+the discount rate, exactly and for every cell of a grid, alongside the ratios themselves. No finite differences
+are needed: every derivative follows from the fundamental theorem of calculus or from the closed form of the
+ratio, so it costs a few IRF evaluations per cell on top of the areas that the ratio needs anyway. This holds
+for any IRF, closed-form or callable (which must then accept arrays of times).
+
+- Moura-Costa: ER = F(TH) / (delay * pulse), with F the prefix area of the IRF, so
+  dER/dTH = IRF(TH) / (delay * pulse) and dER/ddelay = -ER / delay.
+- Lashof: ER = F(TH) / B with B = F(TH) - F(TH - delay), so dB/dTH = IRF(TH) - IRF(TH - delay),
+  dB/ddelay = IRF(TH - delay), and the quotient rule gives both derivatives.
+- New approach: with a constant rate the costs of release are the avoided emission times exp(-r * delay), so
+  ER = 1 / (1 - exp(-r * delay)) for any IRF and dER/dr = -delay * exp(-r * delay) * ER^2,
+  dER/ddelay = -r * exp(-r * delay) * ER^2.
+
+The time horizon solver of contours.py uses dER/dTH for Newton steps (see matching.find_root); the discount rate
+of matching.py is the exact inverse of the new approach ratio.
+"""
+
+# Import packages
+import os
+import numpy as np
+import pandas as pd
+from irf import get_irf
+from profiling import stage
+from sweeps import TIME_HORIZON_COLUMNS, NEW_APPROACH_COLUMNS, moura_costa_cells, lashof_cells, new_approach_cells, \
+    mesh
+
+# Column names of the derivatives, after the columns of the results of every method
+GRADIENT_COLUMNS = {
+    'moura_costa': ['dER/dTH (1/years)', 'dER/dDelay (1/years)'],
+    'lashof': ['dER/dTH (1/years)', 'dER/dDelay (1/years)'],
+    'new_approach': ['dER/dr', 'dER/dDelay']
+}
+
+
+# %% Cell functions: the outputs of the cell functions of sweeps.py followed by the derivatives of the ratio
+def moura_costa_sensitivities(irf, time_horizon, delay, pulse=None):
+    """Costs, benefits and equivalence ratio of the Moura-Costa method, dER/dTH and dER/ddelay."""
+    irf = get_irf(irf)
+    if pulse is None:
+        pulse = irf(0)
+    time_horizon, delay = np.broadcast_arrays(np.asarray(time_horizon, dtype=float), np.asarray(delay, dtype=float))
+    costs, benefits, ratio = moura_costa_cells(irf, time_horizon, delay, pulse)
+    return costs, benefits, ratio, irf(time_horizon) / benefits, -ratio / delay
+
+
+def lashof_sensitivities(irf, time_horizon, delay):
+    """Costs, benefits and equivalence ratio of the Lashof method, dER/dTH and dER/ddelay."""
+    irf = get_irf(irf)
+    time_horizon, delay = np.broadcast_arrays(np.asarray(time_horizon, dtype=float), np.asarray(delay, dtype=float))
+    costs, benefits, ratio = lashof_cells(irf, time_horizon, delay)
+    at_horizon = irf(time_horizon)
+    # IRF at the start of the benefits; cells with TH < delay are NaN already
+    at_start = irf(np.maximum(time_horizon - delay, 0))
+    d_time_horizon = (at_horizon - ratio * (at_horizon - at_start)) / benefits
+    return costs, benefits, ratio, d_time_horizon, -ratio * at_start / benefits
+
+
+def new_approach_ratio_derivatives(r, delay):
+    """dER/dr and dER/ddelay of the new approach ratio 1 / (1 - exp(-r * delay)), the same for every IRF."""
+    r, delay = np.broadcast_arrays(np.asarray(r, dtype=float), np.asarray(delay, dtype=float))
+    discount = np.exp(-r * delay)
+    scale = discount / np.expm1(-r * delay) ** 2
+    return -delay * scale, -r * scale
+
+
+def new_approach_sensitivities(irf, r, delay, quadrature=None):
+    """Avoided emission, costs of release, benefits and equivalence ratio of the new approach, dER/dr and dER/ddelay."""
+    return new_approach_cells(irf, r, delay, quadrature) + new_approach_ratio_derivatives(r, delay)
+
+
+# %% Grid functions: the results of the grid functions of sweeps.py with the derivatives as extra columns
+SENSITIVITIES = {
+    'moura_costa': (moura_costa_sensitivities, TIME_HORIZON_COLUMNS),
+    'lashof': (lashof_sensitivities, TIME_HORIZON_COLUMNS),
+    'new_approach': (new_approach_sensitivities, NEW_APPROACH_COLUMNS)
+}
+
+
+def sensitivity_grid(method, irf, outer, inner, **kwargs):
+    """
+    Results of method for every (outer, inner) pair, in the row order and with the columns of sweeps.py, plus
+    the derivatives of the ratio (see GRADIENT_COLUMNS). Extra keyword arguments go to the cell function (pulse
+    for Moura-Costa, quadrature for the new approach).
+    """
+    if method not in SENSITIVITIES:
+        raise ValueError(f'Unknown method {method!r}')
+    cells, columns = SENSITIVITIES[method]
+    outer, inner = mesh(outer, inner)
+    with stage('integration'):
+        values = (outer, inner) + cells(irf, outer, inner, **kwargs)
+    with stage('dataframe'):
+        return pd.DataFrame(dict(zip(columns + GRADIENT_COLUMNS[method], values)))
+
+
+def save_sensitivities(method, irf, outer, inner, directory, name, **kwargs):
+    """Save sensitivity_grid as {name}_gradients.csv in directory and return the frame."""
+    frame = sensitivity_grid(method, irf, outer, inner, **kwargs)
+    frame.to_csv(os.path.join(directory, f'{name}_gradients.csv'), index=False)
+    return frame
@@ -0,0 +1,106 @@
+"""
+This module computes sweeps that are too large to hold in memory. The outer axis of the grid (time horizons or
+discount rates) is split into chunks, and every chunk is computed with a grid function of sweeps.py and written
+straight into preallocated memory-mapped .npy files, so only one chunk is in RAM at a time. After each chunk a
+progress file records which chunks are complete; an interrupted run resumes from there and only recomputes the
+chunks that were not finished. When all chunks are done the manifest is written and the directory is a store
+that results_store.read_results can read.
+
+The progress file carries a hash of the sweep (see sweep_cache.sweep_key), so a store left behind by a sweep
+with another IRF or grid is started over instead of being resumed.
+"""
+
+# Import packages
+import json
+import os
+import numpy as np
+from numpy.lib.format import open_memmap
+from parallel import split_chunks
+from profiling import progress, stage
+from results_store import MANIFEST, read_manifest, write_manifest
+from sweep_cache import sweep_identity, sweep_key
+
+PROGRESS = 'progress.json'
+
+
+def read_progress(path):
+    progress_path = os.path.join(path, PROGRESS)
+    if not os.path.exists(progress_path):
+        return None
+    with open(progress_path) as file:
+        return json.load(file)
+
+
+def write_progress(path, progress):
+    # Replace the file in one step, so a crash never leaves a half-written progress file
+    temporary_path = os.path.join(path, f'{PROGRESS}.tmp')
+    with open(temporary_path, 'w') as file:
+        json.dump(progress, file, indent=1)
+    os.replace(temporary_path, os.path.join(path, PROGRESS))
+
+
+def _allocate(path, frame, rows, key, chunk_size):
+    """Create the column files of a store of rows rows with the columns and dtypes of frame."""
+    files = [f'column_{i}.npy' for i in range(len(frame.columns))]
+    for file_name, column in zip(files, frame.columns):
+        open_memmap(os.path.join(path, file_name), mode='w+', dtype=frame[column].dtype, shape=(rows,)).flush()
+    progress = {'key': key, 'columns': list(frame.columns), 'files': files, 'rows': rows, 'chunk_size': chunk_size,
+                'done': []}
+    write_progress(path, progress)
+    return progress
+
+
+def stream_grid(grid_function, irf, outer, inner, path, chunk_size=100, **kwargs):
+    """
+    Evaluate grid_function(irf, outer, inner, **kwargs), e.g. sweeps.lashof_grid, chunk_size outer values at a
+    time, into a columnar store at path (a directory). Rows are in the order of the serial sweep. Returns path;
+    a store that is already complete for the same sweep is returned without computing anything. Raises
+    ValueError for an empty outer or inner axis.
+    """
+    outer = np.asarray(outer)
+    inner = np.asarray(inner)
+    if not outer.size or not inner.size:
+        raise ValueError('Cannot stream a sweep with an empty outer or inner axis')
+    key = sweep_key(grid_function.__name__, irf, outer, inner, **kwargs)
+    os.makedirs(path, exist_ok=True)
+    manifest_path = os.path.join(path, MANIFEST)
+    if os.path.exists(manifest_path):
+        if read_manifest(path).get('key') == key:
+            return path
+        os.remove(manifest_path)
+
+    rows = len(outer) * len(inner)
+    chunks = split_chunks(outer, chunk_size)
+    state = read_progress(path)
+    if state is not None and (state['key'] != key or state['chunk_size'] != chunk_size):
+        state = None
+
+    for number, chunk in progress(list(enumerate(chunks)), os.path.basename(path)):
+        if state is not None and number in state['done']:
+            continue
+        frame = grid_function(irf, chunk, inner, **kwargs)
+        if state is None:
+            # The first computed chunk gives the columns and their dtypes
+            state = _allocate(path, frame, rows, key, chunk_size)
+        start = number * chunk_size * len(inner)
+        with stage('store'):
+            for file_name, column in zip(state['files'], state['columns']):
+                data = open_memmap(os.path.join(path, file_name), mode='r+')
+                data[start:start + len(frame)] = frame[column].to_numpy()
+                data.flush()
+                del data
+            # A chunk is recorded only once its rows are on disk
+            state['done'].append(number)
+            write_progress(path, state)
+
+    # The rows follow the outer values, then the inner ones, so the store is sorted on both if they are ascending
+    columns = state['columns']
+    sort_by = []
+    if np.all(np.diff(outer) > 0):
+        sort_by.append(columns[0])
+        if np.all(np.diff(inner) > 0):
+            sort_by.append(columns[1])
+    write_manifest(path, columns, state['files'], sort_by, rows, key=key,
+                   identity=sweep_identity(grid_function, irf, **kwargs))
+    os.remove(os.path.join(path, PROGRESS))
+    return path
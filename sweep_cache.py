@@ -0,0 +1,139 @@
+"""
+This module keeps computed sweeps on disk, keyed by a hash of everything the result depends on: the method, the
+IRF parameters and the grid specification. A sweep whose inputs did not change is read back instead of being
+recomputed, and changing one coefficient only invalidates the (IRF, method) combinations that use it. Entries
+older than max_age seconds are evicted, then the least recently used ones until the cache fits in max_bytes.
+"""
+
+# Import packages
+import hashlib
+import inspect
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from analytic_integration import exp_sum_terms
+from irf import get_irf
+from profiling import stage
+from sweeps import moura_costa_grid, lashof_grid, new_approach_grid
+
+# Sweep methods that can be cached, by name
+METHODS = {
+    'moura_costa': moura_costa_grid,
+    'lashof': lashof_grid,
+    'new_approach': new_approach_grid
+}
+
+# Bump when a change in the sweeps alters the results, so that old entries are not served
+CACHE_VERSION = 1
+
+
+def irf_fingerprint(irf):
+    """JSON-serializable description of an IRF: its coefficients and time constants, or the source of a callable."""
+    irf = get_irf(irf)
+    terms = exp_sum_terms(irf)
+    if terms is not None:
+        coefficients, taus = terms
+        return {'coefficients': np.asarray(coefficients).tolist(), 'taus': np.asarray(taus).tolist()}
+    try:
+        source = inspect.getsource(irf)
+    except (OSError, TypeError):
+        source = repr(irf)
+    return {'callable': f'{getattr(irf, "__module__", "")}.{getattr(irf, "__qualname__", "")}', 'source': source}
+
+
+def sweep_key(method, irf, outer, inner, **kwargs):
+    """Hash of the method, the IRF parameters and the grid of a sweep."""
+    spec = {
+        'version': CACHE_VERSION,
+        'method': method,
+        'irf': irf_fingerprint(irf),
+        'outer': np.asarray(outer).tolist(),
+        'inner': np.asarray(inner).tolist(),
+        'kwargs': kwargs
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def sweep_identity(grid_function, irf, **kwargs):
+    """
+    Hash of the grid function, the IRF parameters and the arguments of a sweep, without its grid. A Moura-Costa
+    pulse is recorded as the value used, to 12 significant digits, so the default pulse IRF(0) and the same pulse
+    given explicitly identify the same sweep (IRF(0) of 'joos2013' is 100 up to the rounding of its coefficients).
+    """
+    if 'pulse' in inspect.signature(grid_function).parameters:
+        pulse = kwargs.get('pulse')
+        kwargs['pulse'] = float(f'{float(get_irf(irf)(0) if pulse is None else pulse):.12g}')
+    return sweep_key(grid_function.__name__, irf, [], [], **kwargs)
+
+
+class SweepCache:
+    """Content-addressed store of sweep results in a directory, one pickled DataFrame per entry."""
+
+    def __init__(self, directory, max_bytes=None, max_age=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.pkl')
+
+    def load(self, key):
+        """
+        Cached frame for key, or None on a miss. An entry older than max_age is removed and is a miss; a hit
+        refreshes the entry's modification time (LRU).
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        if self.max_age is not None and time.time() - os.stat(path).st_mtime > self.max_age:
+            os.remove(path)
+            return None
+        os.utime(path)
+        return pd.read_pickle(path)
+
+    def store(self, key, frame):
+        # Write to a temporary file first so an interrupted write never leaves a truncated entry
+        path = self.path(key)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        frame.to_pickle(temporary_path)
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def entries(self):
+        """(path, size, modification time) of every entry, least recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self):
+        entries = self.entries()
+        if self.max_age is not None:
+            oldest_allowed = time.time() - self.max_age
+            for path, size, modified in [entry for entry in entries if entry[2] < oldest_allowed]:
+                os.remove(path)
+            entries = [entry for entry in entries if entry[2] >= oldest_allowed]
+        if self.max_bytes is not None:
+            total = sum(size for path, size, modified in entries)
+            for path, size, modified in entries:
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+
+    def sweep(self, method, irf, outer, inner, **kwargs):
+        """Result of METHODS[method](irf, outer, inner, **kwargs), computed only on a cache miss."""
+        key = sweep_key(method, irf, outer, inner, **kwargs)
+        with stage('cache read'):
+            frame = self.load(key)
+        if frame is None:
+            frame = METHODS[method](irf, outer, inner, **kwargs)
+            with stage('cache write'):
+                self.store(key, frame)
+        return frame
@@ -0,0 +1,119 @@
+"""
+This module evaluates the Moura-Costa, Lashof and new approach equivalence ratios on whole grids at once.
+Time horizons, delays and discount rates are broadcast against each other with NumPy and the areas under the
+IRF are computed in closed form (see analytic_integration.py), so a grid costs a handful of array operations
+instead of one Python iteration per cell. The IRF is given as an IRF object or registry name (see irf.py);
+a plain callable is also accepted and integrated with quad once per distinct time or discount rate. Cells
+where the time horizon is shorter than the delay are NaN, as in models.py.
+"""
+
+# Import packages
+import numpy as np
+import pandas as pd
+from analytic_integration import exp_sum_terms, exp_sum_area, cumulative_area, integrate
+from irf import get_irf
+from profiling import stage
+
+# Column names of the CSV files written by models.py
+TIME_HORIZON_COLUMNS = ['Time Horizon (years)', 'Delay (years)', 'Costs (ton-years)', 'Benefits (ton-years)',
+                        'Equivalence Ratio']
+NEW_APPROACH_COLUMNS = ['Discount Rate', 'Delay', 'Avoided Emission', 'Costs of Release', 'Benefits',
+                        'Equivalence ratio']
+
+
+# %% Cell functions: every argument is broadcast, the outputs have the broadcast shape
+def moura_costa_cells(irf, time_horizon, delay, pulse=None):
+    """Costs, benefits and equivalence ratio of the Moura-Costa method; pulse defaults to IRF(0)."""
+    irf = get_irf(irf)
+    if pulse is None:
+        pulse = irf(0)
+    time_horizon, delay = np.broadcast_arrays(np.asarray(time_horizon, dtype=float), np.asarray(delay, dtype=float))
+    valid = time_horizon >= delay
+    costs = np.where(valid, cumulative_area(irf, time_horizon), np.nan)
+    benefits = np.where(valid, delay * pulse, np.nan)
+    return costs, benefits, costs / benefits
+
+
+def lashof_cells(irf, time_horizon, delay):
+    """
+    Costs, benefits and equivalence ratio of the Lashof method.
+
+    Costs are the prefix area F(TH) and benefits F(TH) - F(TH - delay). For a callable IRF the prefix areas of
+    all time horizons and delayed horizons are computed together, once per distinct time, so every cell is a
+    lookup and a difference.
+    """
+    irf = get_irf(irf)
+    time_horizon, delay = np.broadcast_arrays(np.asarray(time_horizon, dtype=float), np.asarray(delay, dtype=float))
+    valid = time_horizon >= delay
+    terms = exp_sum_terms(irf)
+    if terms is None:
+        prefix = cumulative_area(irf, np.stack([time_horizon, time_horizon - delay]))
+        costs = prefix[0]
+        benefits = prefix[0] - prefix[1]
+    else:
+        # The benefits are integrated directly over [TH - delay, TH]: for an IRF without a constant term the
+        # difference of prefix areas cancels to zero at long time horizons
+        costs = cumulative_area(irf, time_horizon)
+        benefits = exp_sum_area(*terms, np.maximum(time_horizon - delay, 0), time_horizon)
+    costs = np.where(valid, costs, np.nan)
+    benefits = np.where(valid, benefits, np.nan)
+    return costs, benefits, costs / benefits
+
+
+def new_approach_cells(irf, r, delay, quadrature=None):
+    """
+    Avoided emission, costs of release, benefits and equivalence ratio of the new approach. For a callable IRF
+    quadrature selects a fixed-node rule of quadrature.py ('exp_sinh' or 'laguerre') instead of quad.
+    """
+    irf = get_irf(irf)
+    r, delay = np.broadcast_arrays(np.asarray(r, dtype=float), np.asarray(delay, dtype=float))
+    terms = exp_sum_terms(irf)
+    if terms is None and quadrature is not None:
+        from quadrature import laplace_areas
+        avoided_emission = laplace_areas(irf, r, rule=quadrature)
+        costs_of_release = avoided_emission * np.exp(-r * delay)
+    elif terms is None:
+        # With a constant rate line 2 is line 1 scaled by exp(-r * delay), so quad runs once per distinct rate
+        unique_rates, inverse = np.unique(r, return_inverse=True)
+        areas = np.array([integrate(irf, 0, np.inf, rate) for rate in unique_rates])
+        avoided_emission = areas[inverse].reshape(r.shape)
+        costs_of_release = avoided_emission * np.exp(-r * delay)
+    else:
+        avoided_emission = exp_sum_area(*terms, 0, np.inf, r)
+        costs_of_release = exp_sum_area(*terms, 0, np.inf, r, delay)
+    benefits = avoided_emission - costs_of_release
+    return avoided_emission, costs_of_release, benefits, avoided_emission / benefits
+
+
+# %% Grid functions: outer product of the axes, flattened in the row order of the loops in models.py
+def mesh(outer, inner):
+    """Flattened (outer, inner) grid, the inner axis varying fastest."""
+    outer, inner = np.meshgrid(np.asarray(outer), np.asarray(inner), indexing='ij')
+    return outer.ravel(), inner.ravel()
+
+
+def moura_costa_grid(irf, time_horizons, delays, pulse=None):
+    """Moura-Costa results for every (time horizon, delay) pair, as in moura_costa_JOOS.csv."""
+    time_horizon, delay = mesh(time_horizons, delays)
+    with stage('integration'):
+        costs, benefits, ratio = moura_costa_cells(irf, time_horizon, delay, pulse)
+    with stage('dataframe'):
+        return pd.DataFrame(dict(zip(TIME_HORIZON_COLUMNS, (time_horizon, delay, costs, benefits, ratio))))
+
+
+def lashof_grid(irf, time_horizons, delays):
+    """Lashof results for every (time horizon, delay) pair, as in lashof_JOOS.csv."""
+    time_horizon, delay = mesh(time_horizons, delays)
+    with stage('integration'):
+        costs, benefits, ratio = lashof_cells(irf, time_horizon, delay)
+    with stage('dataframe'):
+        return pd.DataFrame(dict(zip(TIME_HORIZON_COLUMNS, (time_horizon, delay, costs, benefits, ratio))))
+
+
+def new_approach_grid(irf, rates, delays, quadrature=None):
+    """New approach results for every (discount rate, delay) pair, as in new_approach.csv."""
+    r, delay = mesh(rates, delays)
+    with stage('integration'):
+        columns = (r, delay) + new_approach_cells(irf, r, delay, quadrature)
+    with stage('dataframe'):
+        return pd.DataFrame(dict(zip(NEW_APPROACH_COLUMNS, columns)))
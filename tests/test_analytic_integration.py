@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from scipy.integrate import quad
+from analytic_integration import exp_sum_value, integrate, split_terms
+
+# (coefficient, tau) pairs of the Joos et al. (2013) and IPCC (1990) IRFs
+JOOS = [(21.73, np.inf), (22.4, 394.4), (28.24, 36.54), (27.63, 4.304)]
+IPCC = [(0.30036, 6.6993), (0.34278, 71.109), (0.35686, 815.727)]
+
+
+def value(terms):
+    return lambda t: exp_sum_value(*split_terms(terms), t)
+
+
+@pytest.mark.parametrize('terms', [JOOS, IPCC], ids=['joos2013', 'ipcc1990'])
+@pytest.mark.parametrize('start, end', [(0, 100), (20, 1000), (0, 10000)])
+def test_finite_area_matches_quad(terms, start, end):
+    expected = quad(value(terms), start, end, limit=200)[0]
+    assert integrate(terms, start, end) == pytest.approx(expected, rel=1e-10)
+
+
+@pytest.mark.parametrize('terms', [JOOS, IPCC], ids=['joos2013', 'ipcc1990'])
+@pytest.mark.parametrize('r, shift', [(0.01, 0), (0.03, 50), (0.001, 200)])
+def test_discounted_infinite_area_matches_quad(terms, r, shift):
+    irf = value(terms)
+    expected = quad(lambda t: irf(t) * np.exp(-r * (t + shift)), 0, np.inf, limit=200)[0]
+    assert integrate(terms, 0, np.inf, r, shift) == pytest.approx(expected, rel=1e-8)
+
+
+def test_undiscounted_infinite_area():
+    # The constant term of the Joos IRF makes its area over [0, inf) infinite; the IPCC IRF decays to 0
+    assert integrate(JOOS, 0, np.inf) == np.inf
+    assert integrate(IPCC, 0, np.inf) == pytest.approx(quad(value(IPCC), 0, np.inf, limit=200)[0], rel=1e-10)
+
+
+def test_callable_falls_back_to_quad():
+    assert integrate(value(JOOS), 0, 500, 0.02, 30) == pytest.approx(integrate(JOOS, 0, 500, 0.02, 30), rel=1e-10)
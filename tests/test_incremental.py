@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+from incremental import extend_grid
+from results_store import read_results
+from sweeps import lashof_grid, moura_costa_grid, new_approach_grid
+
+TIME_HORIZONS = np.arange(50, 1050, 50)
+DELAYS = np.arange(10, 110, 10)
+
+
+def full_store(grid_function, irf, outer, inner, path):
+    extend_grid(grid_function, irf, outer, inner, path)
+    return read_results(path)
+
+
+@pytest.mark.parametrize('grid_function, outer', [(lashof_grid, TIME_HORIZONS), (moura_costa_grid, TIME_HORIZONS),
+                                                  (new_approach_grid, np.arange(0.001, 0.031, 0.001))])
+def test_extension_equals_full_recompute(tmp_path, grid_function, outer):
+    path = str(tmp_path / 'extended')
+    assert extend_grid(grid_function, 'joos2013', outer[:10], DELAYS[:5], path) == 50
+    # One more delay, then more outer values: only the missing cells are computed
+    assert extend_grid(grid_function, 'joos2013', outer[:10], DELAYS[:6], path) == 10
+    assert extend_grid(grid_function, 'joos2013', outer, DELAYS, path) == len(outer) * len(DELAYS) - 60
+    assert extend_grid(grid_function, 'joos2013', outer, DELAYS, path) == 0
+    expected = full_store(grid_function, 'joos2013', outer, DELAYS, str(tmp_path / 'full'))
+    pd.testing.assert_frame_equal(read_results(path), expected)
+
+
+def test_other_sweep_is_not_extended(tmp_path):
+    path = str(tmp_path / 'lashof')
+    extend_grid(lashof_grid, 'joos2013', TIME_HORIZONS, DELAYS, path)
+    with pytest.raises(ValueError):
+        extend_grid(lashof_grid, 'ipcc1990', TIME_HORIZONS, DELAYS, path)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from matching import best_discount_rates, best_time_horizons
+from sweeps import lashof_grid, new_approach_grid
+
+RATE_STEP = 0.001
+
+
+def small_grid():
+    """Lashof and new approach frames of the Joos IRF as read by new_analysis.py, on a small grid."""
+    lashof = lashof_grid('joos2013', np.arange(50, 1050, 100), np.arange(10, 210, 20))
+    new_approach = new_approach_grid('joos2013', np.arange(0.001, 0.031, RATE_STEP), np.arange(10, 201, 20))
+    return lashof.dropna(subset=['Equivalence Ratio']), new_approach
+
+
+def scanned_discount_rates(new_approach, lashof):
+    """The loop of new_analysis.py: nearest new approach ratio on the rate grid for every Lashof row."""
+    results = []
+    for time_horizon in lashof['Time Horizon (years)'].unique():
+        filtered_lashof = lashof[lashof['Time Horizon (years)'] == time_horizon]
+        for delay in filtered_lashof['Delay (years)'].unique():
+            lashof_ratio = filtered_lashof[filtered_lashof['Delay (years)'] == delay]['Equivalence Ratio'].values[0]
+            filtered_new_approach = new_approach[new_approach['Delay'] == delay]
+            best_discount_rate = None
+            smallest_difference = float('inf')
+            for discount_rate in filtered_new_approach['Discount Rate'].unique():
+                new_approach_ratio = filtered_new_approach[filtered_new_approach['Discount Rate'] == discount_rate][
+                    'Equivalence ratio'].values[0]
+                difference = abs(new_approach_ratio - lashof_ratio)
+                if difference < smallest_difference:
+                    smallest_difference = difference
+                    best_discount_rate = discount_rate
+            results.append({'Time Horizon (years)': time_horizon, 'Delay (years)': delay,
+                            'Best Discount Rate': best_discount_rate, 'Smallest Difference': smallest_difference})
+    return pd.DataFrame(results)
+
+
+def scanned_time_horizons(new_approach, lashof):
+    """The loop of original_analysis_and_plots.py: nearest Lashof ratio at the same delay for every new approach row."""
+    results = []
+    for discount_rate in new_approach['Discount Rate'].unique():
+        filtered_new_approach = new_approach[new_approach['Discount Rate'] == discount_rate]
+        for delay in filtered_new_approach['Delay'].unique():
+            if delay not in lashof['Delay (years)'].values:
+                continue
+            new_approach_ratio = filtered_new_approach[filtered_new_approach['Delay'] == delay][
+                'Equivalence ratio'].values[0]
+            filtered_lashof = lashof[lashof['Delay (years)'] == delay]
+            best_time_horizon = None
+            smallest_difference = float('inf')
+            for time_horizon in filtered_lashof['Time Horizon (years)'].unique():
+                lashof_ratio = filtered_lashof[filtered_lashof['Time Horizon (years)'] == time_horizon][
+                    'Equivalence Ratio'].values[0]
+                difference = abs(new_approach_ratio - lashof_ratio)
+                if difference < smallest_difference:
+                    smallest_difference = difference
+                    best_time_horizon = time_horizon
+            results.append((discount_rate, delay, best_time_horizon, smallest_difference))
+    return pd.DataFrame(results, columns=['Discount Rate', 'Delay', 'Best Time Horizon', 'Smallest Difference'])
+
+
+def test_best_discount_rates_refine_the_scan():
+    lashof, new_approach = small_grid()
+    solved = best_discount_rates(lashof, 'joos2013')
+    scanned = scanned_discount_rates(new_approach, lashof)
+    pd.testing.assert_frame_equal(solved[['Time Horizon (years)', 'Delay (years)']],
+                                  scanned[['Time Horizon (years)', 'Delay (years)']], check_dtype=False)
+    # Where the solved rate lies inside the scanned grid, the scan finds its nearest grid rate (up to one step)
+    # and the solved rate matches the Lashof ratio at least as closely
+    inside = (solved['Best Discount Rate'] > 0.001 + RATE_STEP) & (solved['Best Discount Rate'] < 0.030 - RATE_STEP)
+    assert inside.sum() > 10
+    np.testing.assert_array_less(np.abs(solved['Best Discount Rate'] - scanned['Best Discount Rate'])[inside],
+                                 RATE_STEP + 1e-12)
+    np.testing.assert_array_less(solved['Smallest Difference'][inside],
+                                 scanned['Smallest Difference'][inside] + 1e-9)
+
+
+def test_best_time_horizons_match_the_loop():
+    lashof, _ = small_grid()
+    # Delays of 210 and 230 years have no Lashof rows and are dropped
+    new_approach = new_approach_grid('joos2013', np.arange(0.001, 0.031, RATE_STEP), np.arange(10, 240, 20))
+    pd.testing.assert_frame_equal(best_time_horizons(new_approach, lashof), scanned_time_horizons(new_approach, lashof),
+                                  check_dtype=False)
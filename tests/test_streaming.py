@@ -0,0 +1,55 @@
+import functools
+import numpy as np
+import pandas as pd
+import pytest
+from results_store import read_results
+from streaming import read_progress, stream_grid
+from sweeps import lashof_grid
+
+TIME_HORIZONS = np.arange(50, 1050, 50)
+DELAYS = np.arange(10, 110, 10)
+
+
+class Killed(Exception):
+    pass
+
+
+def interrupted_lashof(calls, kill_at=None):
+    """The Lashof sweep under its own name (the store key uses it), recording its chunks and failing at kill_at."""
+    @functools.wraps(lashof_grid)
+    def grid(irf, time_horizons, delays):
+        if len(calls) == kill_at:
+            raise Killed
+        calls.append(time_horizons[0])
+        return lashof_grid(irf, time_horizons, delays)
+    return grid
+
+
+def test_resume_after_a_killed_chunk(tmp_path):
+    path = str(tmp_path / 'lashof')
+    calls = []
+    with pytest.raises(Killed):
+        stream_grid(interrupted_lashof(calls, kill_at=2), 'joos2013', TIME_HORIZONS, DELAYS, path, chunk_size=5)
+    assert read_progress(path)['done'] == [0, 1]
+
+    calls = []
+    stream_grid(interrupted_lashof(calls), 'joos2013', TIME_HORIZONS, DELAYS, path, chunk_size=5)
+    # Only the two chunks that were not finished are computed
+    assert calls == [TIME_HORIZONS[10], TIME_HORIZONS[15]]
+    assert read_progress(path) is None
+    pd.testing.assert_frame_equal(read_results(path), lashof_grid('joos2013', TIME_HORIZONS, DELAYS))
+
+
+def test_progress_of_another_sweep_is_started_over(tmp_path):
+    path = str(tmp_path / 'lashof')
+    with pytest.raises(Killed):
+        stream_grid(interrupted_lashof([], kill_at=1), 'ipcc1990', TIME_HORIZONS, DELAYS, path, chunk_size=5)
+    calls = []
+    stream_grid(interrupted_lashof(calls), 'joos2013', TIME_HORIZONS, DELAYS, path, chunk_size=5)
+    assert len(calls) == 4
+    pd.testing.assert_frame_equal(read_results(path), lashof_grid('joos2013', TIME_HORIZONS, DELAYS))
+
+
+def test_empty_axis_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        stream_grid(lashof_grid, 'joos2013', [], DELAYS, str(tmp_path / 'lashof'))
@@ -0,0 +1,73 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import sweep_cache
+from sweep_cache import SweepCache, sweep_key
+from sweeps import lashof_grid
+
+TIME_HORIZONS = np.arange(50, 550, 50)
+DELAYS = np.arange(10, 110, 10)
+
+
+def counting_lashof(monkeypatch):
+    """Replace the Lashof sweep of the cache with one that records its calls."""
+    calls = []
+
+    def grid(*args, **kwargs):
+        calls.append(args)
+        return lashof_grid(*args, **kwargs)
+
+    monkeypatch.setitem(sweep_cache.METHODS, 'lashof', grid)
+    return calls
+
+
+def age(path, seconds):
+    """Set the modification time of path to seconds ago."""
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_miss_then_hit(tmp_path, monkeypatch):
+    calls = counting_lashof(monkeypatch)
+    cache = SweepCache(tmp_path)
+    first = cache.sweep('lashof', 'joos2013', TIME_HORIZONS, DELAYS)
+    second = cache.sweep('lashof', 'joos2013', TIME_HORIZONS, DELAYS)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    pd.testing.assert_frame_equal(first, lashof_grid('joos2013', TIME_HORIZONS, DELAYS))
+
+
+def test_other_grid_or_irf_is_a_miss(tmp_path, monkeypatch):
+    calls = counting_lashof(monkeypatch)
+    cache = SweepCache(tmp_path)
+    cache.sweep('lashof', 'joos2013', TIME_HORIZONS, DELAYS)
+    cache.sweep('lashof', 'joos2013', TIME_HORIZONS, DELAYS[:-1])
+    cache.sweep('lashof', 'ipcc1990', TIME_HORIZONS, DELAYS)
+    assert len(calls) == 3
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_expired_entry_is_a_miss_and_removed(tmp_path, monkeypatch):
+    calls = counting_lashof(monkeypatch)
+    cache = SweepCache(tmp_path, max_age=60)
+    cache.sweep('lashof', 'joos2013', TIME_HORIZONS, DELAYS)
+    key = sweep_key('lashof', 'joos2013', TIME_HORIZONS, DELAYS)
+    age(cache.path(key), 120)
+    assert cache.load(key) is None
+    assert not os.path.exists(cache.path(key))
+    cache.sweep('lashof', 'joos2013', TIME_HORIZONS, DELAYS)
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SweepCache(tmp_path)
+    frame = lashof_grid('joos2013', TIME_HORIZONS, DELAYS)
+    for number, key in enumerate(['a', 'b', 'c']):
+        cache.store(key, frame)
+        age(cache.path(key), 30 - 10 * number)
+    # A hit makes the oldest entry the most recently used one
+    assert cache.load('a') is not None
+    cache.max_bytes = 2 * os.path.getsize(cache.path('a'))
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ['a.pkl', 'c.pkl']
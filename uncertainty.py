@@ -0,0 +1,121 @@
+"""
+This module propagates the uncertainty of the IRF parameters to the equivalence ratios. N parameter sets are
+drawn around the central IRF, and the ratios of every sample and every grid cell are evaluated in one batch:
+the samples run along a leading axis of the coefficient and time constant arrays, which exp_sum_area
+broadcasts against the grid. The result is a table of percentile bands per (time horizon, delay) for the
+Moura-Costa and Lashof methods and per (discount rate, delay) for the new approach.
+
+To bound memory, the outer axis of the grid is processed in batches so that at most about max_values
+(sample x cell x term) values are held at once; the percentiles of a batch are reduced before the next one.
+
+The amplitudes and time constants are drawn independently and uniformly within relative spreads around their
+central values. The amplitudes are then rescaled to their central total, so every sample still starts from
+the whole pulse (IRF(0) is unchanged). Constant terms (tau = inf) stay constant. The spreads have no default:
+pass the ranges of the source (e.g. Joos et al. (2013), table 5) as amplitude_spread and tau_spread, either one
+value for all terms or one per term.
+
+With a constant discount rate the new approach ratio is 1 / (1 - exp(-r * delay)) for any IRF, so its bands
+collapse to the central value; they are computed anyway, so that the same code serves other discount
+functions.
+"""
+
+# Import packages
+import numpy as np
+import pandas as pd
+from analytic_integration import exp_sum_area, exp_sum_terms
+from irf import get_irf
+from profiling import progress
+from sweeps import mesh
+
+PERCENTILES = (5, 50, 95)
+
+
+def sample_parameters(irf, n_samples, amplitude_spread, tau_spread, seed=None):
+    """
+    Draw n_samples coefficient and time constant sets around those of an IRF object or registry name.
+    Returns two arrays of shape (n_samples, terms).
+    """
+    coefficients, taus = exp_sum_terms(get_irf(irf))
+    rng = np.random.default_rng(seed)
+    shape = (n_samples, len(coefficients))
+    amplitude_spread = np.broadcast_to(amplitude_spread, coefficients.shape)
+    tau_spread = np.broadcast_to(tau_spread, taus.shape)
+    sampled_coefficients = coefficients * rng.uniform(1 - amplitude_spread, 1 + amplitude_spread, shape)
+    sampled_coefficients *= coefficients.sum() / sampled_coefficients.sum(axis=1, keepdims=True)
+    sampled_taus = np.where(np.isinf(taus), np.inf, taus * rng.uniform(1 - tau_spread, 1 + tau_spread, shape))
+    return sampled_coefficients, sampled_taus
+
+
+def sample_ratios(method, coefficients, taus, outer, inner, pulse=None):
+    """
+    Equivalence ratios of every sample on the grid outer x inner, an array of shape (samples, outer, inner).
+    method is 'moura_costa' or 'lashof' (outer: time horizons) or 'new_approach' (outer: discount rates);
+    inner are the delays. The Moura-Costa pulse defaults to IRF(0) of each sample.
+
+    Every quantity is computed on the axis it depends on and broadcast to the grid at the end: the costs of the
+    time horizon methods depend on the time horizon only and, with a constant discount rate, the costs of
+    release of the new approach are the avoided emission times exp(-r * delay). The Lashof benefits
+    a * tau * exp(-TH / tau) * (exp(delay / tau) - 1) of the decaying terms factor into a time horizon part and
+    a delay part, which are contracted over the terms with one matrix product per sample.
+    """
+    outer, delay = np.asarray(outer, dtype=float), np.asarray(inner, dtype=float)
+    if method == 'new_approach':
+        avoided_emission = exp_sum_area(coefficients[:, np.newaxis, :], taus[:, np.newaxis, :], 0, np.inf, outer)
+        costs_of_release = avoided_emission[:, :, np.newaxis] * np.exp(-np.outer(outer, delay))
+        return avoided_emission[:, :, np.newaxis] / (avoided_emission[:, :, np.newaxis] - costs_of_release)
+    valid = outer[:, np.newaxis] >= delay
+    costs = exp_sum_area(coefficients[:, np.newaxis, :], taus[:, np.newaxis, :], 0, outer)[:, :, np.newaxis]
+    if method == 'moura_costa':
+        pulse = coefficients.sum(axis=-1) if pulse is None else np.broadcast_to(pulse, coefficients.shape[:1])
+        benefits = pulse[:, np.newaxis, np.newaxis] * delay
+    elif method == 'lashof':
+        benefits = _lashof_benefits(coefficients, taus, outer, delay)
+    else:
+        raise ValueError(f'Unknown method {method!r}')
+    return np.where(valid, costs / np.where(valid, benefits, 1), np.nan)
+
+
+def _lashof_benefits(coefficients, taus, time_horizon, delay):
+    """Area over [TH - delay, TH] of every sample, shape (samples, time horizons, delays)."""
+    constant = np.isinf(taus)
+    finite_taus = np.where(constant, 1.0, taus)
+    if delay.max(initial=0) / finite_taus.min() > 700:
+        # exp(delay / tau) would overflow: integrate every cell instead
+        return exp_sum_area(coefficients[:, np.newaxis, np.newaxis, :], taus[:, np.newaxis, np.newaxis, :],
+                            np.maximum(time_horizon[:, np.newaxis] - delay, 0), time_horizon[:, np.newaxis])
+    decaying = np.where(constant, 0.0, coefficients * finite_taus)
+    horizon_part = decaying[:, np.newaxis, :] * np.exp(-time_horizon[:, np.newaxis] / finite_taus[:, np.newaxis, :])
+    delay_part = np.expm1(delay[:, np.newaxis] / finite_taus[:, np.newaxis, :])
+    constant_part = np.where(constant, coefficients, 0.0).sum(axis=-1)
+    return horizon_part @ delay_part.transpose(0, 2, 1) + constant_part[:, np.newaxis, np.newaxis] * delay
+
+
+def percentile_bands(method, irf, outer, inner, amplitude_spread, tau_spread, n_samples=10000,
+                     percentiles=PERCENTILES, pulse=None, seed=None, max_values=2 * 10 ** 7):
+    """
+    Percentile bands of the equivalence ratio over n_samples IRF parameter sets drawn within the relative
+    spreads amplitude_spread and tau_spread (see sample_parameters), on the grid outer x inner in
+    the row order of the sweeps of sweeps.py. Returns a DataFrame with the grid columns, the ratio of the
+    central IRF and one column per percentile ('Equivalence Ratio P5', ...).
+    """
+    irf = get_irf(irf)
+    coefficients, taus = sample_parameters(irf, n_samples, amplitude_spread, tau_spread, seed)
+    central_coefficients, central_taus = (x[np.newaxis] for x in exp_sum_terms(irf))
+    outer, inner = np.asarray(outer), np.asarray(inner)
+    batch = max(1, max_values // (n_samples * len(inner) * coefficients.shape[1]))
+    bands, central = [], []
+    for start in progress(range(0, len(outer), batch), f'{method} uncertainty'):
+        chunk = outer[start:start + batch]
+        ratios = sample_ratios(method, coefficients, taus, chunk, inner, pulse)
+        bands.append(np.percentile(ratios, percentiles, axis=0).reshape(len(percentiles), -1))
+        central.append(sample_ratios(method, central_coefficients, central_taus, chunk, inner, pulse).ravel())
+    bands, central = np.concatenate(bands, axis=1), np.concatenate(central)
+    outer_values, inner_values = mesh(outer, inner)
+    if method == 'new_approach':
+        columns = {'Discount Rate': outer_values, 'Delay': inner_values}
+    else:
+        columns = {'Time Horizon (years)': outer_values, 'Delay (years)': inner_values}
+    columns['Equivalence Ratio'] = central
+    for percentile, band in zip(percentiles, bands):
+        columns[f'Equivalence Ratio P{percentile:g}'] = band
+    return pd.DataFrame(columns)